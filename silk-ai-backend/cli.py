@@ -0,0 +1,433 @@
+"""
+Silk AI admin CLI.
+
+    python cli.py backfill --concurrency 4 --rpm 40 --checkpoint backfill.ckpt
+    python cli.py backfill --all --case-type Commercial --since 2025-01-01 --dry-run
+    python cli.py compress-columns --vacuum
+    python cli.py reindex-similar
+    python cli.py reindex-search
+    python cli.py purge-paragraph-cache
+    python cli.py verify-firm-member counsel@denning.example --firm "Denning Chambers"
+    python cli.py bench-ner --backend spacy_sm --backend regex
+
+Run from the backend directory so settings and the database resolve as they do for the API.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, text, tuple_, type_coerce
+from sqlalchemy.orm import undefer
+from sqlalchemy.types import NullType
+
+from column_types import CompressedJSON, CompressedText, is_compressed
+from config import settings
+from database import Base, SessionLocal, engine, init_db, write_session
+from models import AnalysisReport, AnonymizedParagraph, Case, User
+
+logger = logging.getLogger("silk_ai.cli")
+
+NER_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "ner_legal_briefs.jsonl")
+
+
+# --- backfill ---
+class Checkpoint:
+    """Append-only record of processed case ids, so an interrupted run resumes where it stopped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    status, _, case_id = line.rstrip("\n").partition("\t")
+                    if status == "ok":
+                        self.done.add(case_id)
+        self._file = open(path, "a")
+
+    def record(self, case_id: str, ok: bool):
+        self._file.write(f"{'ok' if ok else 'failed'}\t{case_id}\n")
+        self._file.flush()
+        if ok:
+            self.done.add(case_id)
+
+    def close(self):
+        self._file.close()
+
+
+def _backfill_query(db, args):
+    from services.claude_service import CLAUDE_MODEL, PROMPT_VERSION
+
+    query = (
+        db.query(Case.id)
+        .outerjoin(AnalysisReport, (AnalysisReport.case_id == Case.id) & AnalysisReport.is_current.is_(True))
+        .filter(Case.status.in_(args.status), Case.brief_anonymized.isnot(None))
+    )
+    if args.case_type:
+        query = query.filter(Case.case_type == args.case_type)
+    if args.jurisdiction:
+        query = query.filter(Case.jurisdiction == args.jurisdiction)
+    if args.owner:
+        query = query.join(User, User.id == Case.owner_id).filter(User.email == args.owner)
+    if args.since:
+        query = query.filter(Case.created_at >= args.since)
+    if args.until:
+        query = query.filter(Case.created_at < args.until)
+    if not args.all:
+        # Only cases whose current report came from a different model or prompt
+        query = query.filter(
+            or_(
+                AnalysisReport.id.is_(None),
+                AnalysisReport.model.is_distinct_from(CLAUDE_MODEL),
+                AnalysisReport.prompt_version.is_distinct_from(PROMPT_VERSION),
+            )
+        )
+    return query
+
+
+async def _reanalyse(case_id: str) -> bool:
+    from services import usage
+    from services.claude_service import analyse_case
+    from services.reports import save_report
+    from services.similarity import build_prior_context
+
+    db = SessionLocal()
+    try:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if not case or not case.brief_anonymized:
+            return False
+        brief, case_type, jurisdiction = case.brief_anonymized, case.case_type, case.jurisdiction
+        prior_context = build_prior_context(db, case) if case.use_prior_analyses else None
+        usage.attribute_to(case.owner_id, case.owner.verified_firm, case.id)
+    finally:
+        db.close()
+
+    result = await analyse_case(brief, case_type, jurisdiction, prior_context)
+
+    with write_session() as db:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if not case:
+            return False
+        save_report(db, case, result)
+    return True
+
+
+async def backfill(args) -> int:
+    from services.claude_service import rate_limiter
+
+    rate_limiter.set_rate(args.rpm)
+
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            print(_backfill_query(db, args).count())
+        finally:
+            db.close()
+        return 0
+
+    checkpoint = Checkpoint(args.checkpoint)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    stats = Counter()
+
+    async def produce():
+        after, queued = None, 0
+        try:
+            while args.limit is None or queued < args.limit:
+                db = SessionLocal()
+                try:
+                    query = _backfill_query(db, args)
+                    if after is not None:
+                        query = query.filter(Case.id > after)
+                    batch = [case_id for (case_id,) in query.order_by(Case.id).limit(args.batch_size)]
+                finally:
+                    db.close()
+                if not batch:
+                    break
+                after = batch[-1]
+                for case_id in batch:
+                    if case_id in checkpoint.done:
+                        stats["skipped"] += 1
+                        continue
+                    await queue.put(case_id)
+                    queued += 1
+                    if args.limit is not None and queued >= args.limit:
+                        break
+        finally:
+            for _ in range(args.concurrency):
+                await queue.put(None)
+
+    async def work():
+        while (case_id := await queue.get()) is not None:
+            try:
+                ok = await _reanalyse(case_id)
+            except Exception as e:
+                logger.error(f"Re-analysis failed for {case_id}: {e}")
+                ok = False
+            checkpoint.record(case_id, ok)
+            stats["ok" if ok else "failed"] += 1
+            done = stats["ok"] + stats["failed"]
+            if done % 50 == 0:
+                logger.info(f"Backfill progress: {dict(stats)}")
+
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(args.concurrency)))
+    finally:
+        checkpoint.close()
+        logger.info(f"Backfill finished: {dict(stats)}")
+    return 1 if stats["failed"] else 0
+
+
+# --- compress-columns ---
+def _compressed_columns():
+    for table in Base.metadata.sorted_tables:
+        columns = [c for c in table.columns if isinstance(c.type, (CompressedText, CompressedJSON))]
+        if columns:
+            yield table, columns
+
+
+def _convert_postgres_columns(table, columns):
+    """Legacy text/json columns become bytea in place; their old contents stay readable."""
+    with engine.begin() as conn:
+        for column in columns:
+            data_type = conn.execute(
+                text("SELECT data_type FROM information_schema.columns WHERE table_name = :t AND column_name = :c"),
+                {"t": table.name, "c": column.name},
+            ).scalar()
+            if data_type and data_type != "bytea":
+                logger.info(f"Converting {table.name}.{column.name} from {data_type} to bytea")
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ALTER COLUMN "{column.name}" TYPE bytea '
+                    f'USING convert_to("{column.name}"::text, \'UTF8\')'
+                ))
+
+
+def compress_columns(args) -> int:
+    """
+    Rewrite rows stored before compression was introduced. Safe to re-run and to interrupt.
+
+    On Postgres the column types must change before the new code serves traffic, since it
+    writes bytea into what were text/json columns. ALTER TYPE rewrites the table under an
+    exclusive lock, so deploy in this order:
+        1. stop the API, run ``compress-columns --schema-only``
+        2. deploy and start the new release
+        3. run ``compress-columns`` while serving; rows are compressed in small batches
+    SQLite needs no schema change and can go straight to step 3.
+    """
+    for table, columns in _compressed_columns():
+        if engine.dialect.name == "postgresql":
+            _convert_postgres_columns(table, columns)
+        if args.schema_only:
+            continue
+
+        pk = list(table.primary_key.columns)
+        key = tuple_(*pk) if len(pk) > 1 else pk[0]
+        # NullType skips the column's own decoding, so we see exactly what is stored
+        raw = [type_coerce(c, NullType()).label(c.name) for c in columns]
+        after, rewritten, bytes_before = None, 0, 0
+        while True:
+            query = select(*pk, *raw).order_by(*pk).limit(args.batch_size)
+            if after is not None:
+                query = query.where(key > (tuple_(*after) if len(pk) > 1 else after[0]))
+            with write_session() as db:
+                rows = db.execute(query).all()
+                if not rows:
+                    break
+                after = tuple(rows[-1][: len(pk)])
+                for row in rows:
+                    values = row[len(pk):]
+                    stale = {
+                        c.name: c.type.process_result_value(value, engine.dialect)
+                        for c, value in zip(columns, values)
+                        if value is not None and not is_compressed(value)
+                    }
+                    if stale:
+                        bytes_before += sum(len(v) for v in values if v is not None and not is_compressed(v))
+                        match = and_(*(c == v for c, v in zip(pk, row[: len(pk)])))
+                        db.execute(table.update().where(match).values(**stale))
+                        rewritten += 1
+        logger.info(f"{table.name}: compressed {rewritten} rows ({bytes_before} bytes of legacy data)")
+
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # Reclaims the freed pages; takes an exclusive lock for the duration
+            conn.execute(text("VACUUM" if engine.dialect.name == "sqlite" else "VACUUM ANALYZE"))
+    return 0
+
+
+# --- reindex ---
+def _reindex(index_case, batch_size: int, *criteria) -> int:
+    """Re-run ``index_case(db, case)`` over every case matching ``criteria``, one transaction per batch."""
+    after, indexed = None, 0
+    while True:
+        with write_session() as db:
+            query = db.query(Case).options(undefer(Case.brief_anonymized)).filter(*criteria)
+            if after is not None:
+                query = query.filter(Case.id > after)
+            batch = query.order_by(Case.id).limit(batch_size).all()
+            if not batch:
+                return indexed
+            for case in batch:
+                index_case(db, case)
+            after = batch[-1].id
+            indexed += len(batch)
+        logger.info(f"Indexed {indexed} cases")
+
+
+def reindex_similar(args) -> int:
+    """Compute MinHash signatures for cases anonymized before the similarity index existed."""
+    from services import similarity
+
+    indexed = _reindex(similarity.index_case, args.batch_size, Case.brief_anonymized.isnot(None))
+    logger.info(f"Similarity index rebuilt for {indexed} cases")
+    return 0
+
+
+def reindex_search(args) -> int:
+    """Refresh the full-text document of every case, e.g. for cases created before search existed."""
+    from services import search
+
+    logger.info(f"Search index rebuilt for {_reindex(search.index_case, args.batch_size)} cases")
+    return 0
+
+
+# --- purge-paragraph-cache ---
+def purge_paragraph_cache(args) -> int:
+    """Delete anonymized paragraphs older than settings.anonymization_cache_days. Run it daily."""
+    if settings.anonymization_cache_days <= 0:
+        logger.info("anonymization_cache_days is 0; cached paragraphs never expire")
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=settings.anonymization_cache_days)
+    with write_session() as db:
+        purged = (
+            db.query(AnonymizedParagraph)
+            .filter(AnonymizedParagraph.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+    logger.info(f"Purged {purged} cached paragraphs created before {cutoff:%Y-%m-%d}")
+    return 0
+
+
+# --- firm membership ---
+def verify_firm_member(args) -> int:
+    """
+    Confirm (or with --revoke, withdraw) a user's membership of their self-declared firm.
+    --firm must match the account's firm exactly, so an operator can't verify the wrong one.
+    """
+    with write_session() as db:
+        user = db.query(User).filter(User.email == args.email).first()
+        if user is None:
+            print(f"No user with email {args.email}", file=sys.stderr)
+            return 1
+        if args.revoke:
+            user.firm_verified = False
+        elif user.firm != args.firm:
+            print(f"{args.email} declared firm {user.firm!r}, not {args.firm!r}", file=sys.stderr)
+            return 1
+        else:
+            user.firm_verified = True
+        logger.info(f"{args.email}: firm {user.firm!r} {'verified' if user.firm_verified else 'unverified'}")
+    return 0
+
+
+# --- bench-ner ---
+def bench_ner(args) -> int:
+    from services import ner
+
+    samples = ner.load_fixtures(args.fixtures)
+    print(f"{'backend':<10} {'chars/s':>12} {'recall':>7} {'precision':>9}  recall by label")
+    for name in args.backend or list(ner.BACKENDS):
+        try:
+            backend = ner.load_backend(name)
+        except ner.BackendUnavailable as e:
+            print(f"{name:<10} unavailable: {e}")
+            continue
+        result = ner.benchmark(backend, samples, repeat=args.repeat)
+        by_label = " ".join(f"{label}={value:.2f}" for label, value in result.recall_by_label.items())
+        print(
+            f"{name:<10} {result.chars_per_second:>12,.0f} {result.recall:>7.3f} {result.precision:>9.3f}  {by_label}"
+        )
+    return 0
+
+
+def _date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Silk AI admin commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bf = commands.add_parser("backfill", help="Re-run analysis for existing cases, writing new report versions")
+    bf.add_argument("--status", action="append", help="Case status to include (repeatable, default: complete)")
+    bf.add_argument("--case-type")
+    bf.add_argument("--jurisdiction")
+    bf.add_argument("--owner", help="Owner email")
+    bf.add_argument("--since", type=_date, help="Only cases created on/after this ISO date")
+    bf.add_argument("--until", type=_date, help="Only cases created before this ISO date")
+    bf.add_argument("--all", action="store_true", help="Include reports already on the current model and prompt")
+    bf.add_argument("--limit", type=int, help="Stop after this many cases")
+    bf.add_argument("--concurrency", type=int, default=4)
+    bf.add_argument(
+        "--rpm", type=float, default=settings.claude_requests_per_minute, help="Outbound Claude requests per minute"
+    )
+    bf.add_argument("--batch-size", type=int, default=500)
+    bf.add_argument("--checkpoint", default="backfill.checkpoint", help="Progress file; reuse it to resume")
+    bf.add_argument("--dry-run", action="store_true", help="Print the number of matching cases and exit")
+
+    cc = commands.add_parser("compress-columns", help="Compress text/JSON columns written before compression")
+    cc.add_argument("--batch-size", type=int, default=500)
+    cc.add_argument("--vacuum", action="store_true", help="Reclaim freed space afterwards")
+    cc.add_argument(
+        "--schema-only", action="store_true", help="Postgres: only convert column types (run before deploying)"
+    )
+
+    rs = commands.add_parser("reindex-similar", help="Rebuild MinHash signatures for similar-case matching")
+    rs.add_argument("--batch-size", type=int, default=200)
+
+    ri = commands.add_parser("reindex-search", help="Rebuild the full-text search index for every case")
+    ri.add_argument("--batch-size", type=int, default=200)
+
+    commands.add_parser("purge-paragraph-cache", help="Delete expired entries from the anonymization cache")
+
+    vf = commands.add_parser("verify-firm-member", help="Confirm a user's membership of the firm they registered with")
+    vf.add_argument("email")
+    vf_action = vf.add_mutually_exclusive_group(required=True)
+    vf_action.add_argument("--firm", help="The firm being confirmed; must match the account exactly")
+    vf_action.add_argument("--revoke", action="store_true", help="Withdraw a previous confirmation")
+
+    bn = commands.add_parser("bench-ner", help="Measure NER backend throughput and recall on labelled briefs")
+    bn.add_argument("--backend", action="append", help="Backend to measure (repeatable, default: all)")
+    bn.add_argument("--fixtures", default=NER_FIXTURES, help="Labelled JSONL (see services.ner.load_fixtures)")
+    bn.add_argument("--repeat", type=int, default=3)
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=getattr(logging, settings.log_level, logging.INFO))
+    args = build_parser().parse_args(argv)
+    if args.command == "bench-ner":
+        return bench_ner(args)
+    init_db()
+
+    if args.command == "backfill":
+        args.status = args.status or ["complete"]
+        return asyncio.run(backfill(args))
+    if args.command == "compress-columns":
+        return compress_columns(args)
+    if args.command == "reindex-similar":
+        return reindex_similar(args)
+    if args.command == "reindex-search":
+        return reindex_search(args)
+    if args.command == "purge-paragraph-cache":
+        return purge_paragraph_cache(args)
+    if args.command == "verify-firm-member":
+        return verify_firm_member(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Compressed column types for large text and JSON fields.
+
+Values are stored as binary with a one-byte codec tag:
+    0x00  uncompressed UTF-8 (values too small to benefit)
+    0x01  zlib, primed with the shared dictionary _ZDICT_V1
+Rows written before compression was introduced (plain text, or JSON text) are
+still readable, so on SQLite ``cli.py compress-columns`` can run against a live
+database. Postgres columns must first become bytea, which takes an exclusive lock;
+see compress_columns() for the deploy order.
+A dictionary must never change once rows reference its tag; add a new tag instead.
+"""
+import json
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+RAW = b"\x00"
+ZLIB_V1 = b"\x01"
+MIN_COMPRESS_BYTES = 128
+LEVEL = 6
+
+# Phrases common to briefs, anonymization placeholders and report JSON. Later entries are
+# closer to the window end and so cheaper to reference; keep the most frequent last.
+_ZDICT_V1 = " ".join([
+    "barrister_profiles precedent_cases opposition_arguments risk_areas preparation_steps",
+    '"argument": "score": "weakness": "pivot": "name": "style": "lessons":',
+    "plaintiff defendant claimant respondent appellant applicant tribunal magistrate",
+    "pursuant to section subsection paragraph schedule regulation act of parliament",
+    "breach of contract negligence duty of care damages injunction liability indemnity",
+    "the court held that the judge found that on the balance of probabilities",
+    "evidence witness statement cross-examination affidavit exhibit submission",
+    "hearing trial appeal judgment order costs settlement agreement clause",
+    "[ORGANISATION] [LOCATION] [DATE] [EMAIL] [PHONE] [ACCOUNT] [POSTCODE]",
+    "[PERSON] [PERSON] [PERSON] the the of the in the and the to the",
+]).encode("utf-8")
+
+
+def compress(data: bytes) -> bytes:
+    if len(data) < MIN_COMPRESS_BYTES:
+        return RAW + data
+    compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, zdict=_ZDICT_V1)
+    packed = compressor.compress(data) + compressor.flush()
+    return ZLIB_V1 + packed if len(packed) < len(data) else RAW + data
+
+
+def decompress(value: Any) -> str:
+    """Decode a stored value to text. Accepts legacy uncompressed text as str or bytes."""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    tag = value[:1]
+    if tag == ZLIB_V1:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict=_ZDICT_V1)
+        return (decompressor.decompress(value[1:]) + decompressor.flush()).decode("utf-8")
+    if tag == RAW:
+        return value[1:].decode("utf-8")
+    # Legacy text column converted in place to bytea (Postgres migration)
+    return value.decode("utf-8")
+
+
+def is_compressed(value: Any) -> bool:
+    """Whether a raw stored value is already in the tagged format."""
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:1]) in (RAW, ZLIB_V1)
+
+
+class CompressedText(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        return None if value is None else compress(value.encode("utf-8"))
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        return None if value is None else decompress(value)
+
+
+class CompressedJSON(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def process_result_value(self, value, dialect) -> Any:
+        if value is None:
+            return None
+        # Legacy SQLite JSON columns may come back already decoded by the driver
+        if isinstance(value, (list, dict)):
+            return value
+        return json.loads(decompress(value))
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,6 +13,40 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 1440
+    anonymization_concurrency: int = 4
+    anonymization_cache_days: int = 90  # cached anonymized paragraphs expire after this; 0 = never
+    ner_backend: str = "spacy_sm"  # spacy_sm, spacy_trf or regex (see services/ner.py)
+    ner_workers: int = 2  # NER/redaction processes per API worker; 0 runs pass 1 in a thread instead
+    pii_verification_threshold: float = 1.0  # residual-risk score that sends a paragraph to Claude; 0 = always
+    claude_requests_per_minute: float = 50  # per process; 0 disables the limiter
+    compression_minimum_size: int = 1024
+    pdf_cache_dir: str = "./pdf_cache"
+    pdf_render_workers: int = 2
+    pdf_export_max_cases: int = 500
+    max_upload_mb: int = 50
+    extraction_workers: int = 2
+
+    # Fair-share scheduling of case processing (per API worker)
+    scheduler_max_concurrency: int = 8
+    scheduler_max_per_tenant: int = 4
+    scheduler_max_per_user: int = 2
+    scheduler_tenant_weights: Dict[str, float] = {}  # firm name -> weight, e.g. {"Denning Chambers": 2}
+    case_processing_timeout_seconds: int = 900
+    metrics_token: str = ""  # /metrics requires "Authorization: Bearer <token>"; unset, it is served only in development
+
+    # Monthly Claude spend budgets in USD, checked before scheduling work; 0 = unlimited
+    usage_budget_user_usd: float = 0
+    usage_budget_firm_usd: float = 0
+    usage_firm_budgets_usd: Dict[str, float] = {}  # firm name -> budget, overrides usage_budget_firm_usd
+
+    # Connection pool (both backends) and SQLite tuning
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size_mb: int = 256
+    sqlite_cache_size_mb: int = 64
 
 
 settings = Settings()
@@ -1,17 +1,51 @@
-from sqlalchemy import create_engine
+import threading
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from config import settings
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-)
+IS_SQLITE = settings.database_url.startswith("sqlite")
+
+if IS_SQLITE:
+    engine = create_engine(
+        settings.database_url,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while a writer commits; NORMAL is durable across app crashes in WAL mode
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_mb * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+else:
+    engine = create_engine(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+    )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# SQLite allows a single writer; queueing background writes in-process is cheaper than
+# racing each other on busy_timeout
+_write_lock = threading.Lock() if IS_SQLITE else None
+
 
 def get_db():
     db = SessionLocal()
@@ -21,6 +55,40 @@ def get_db():
         db.close()
 
 
+@contextmanager
+def write_session():
+    """
+    Short-lived session for background writers (the pipeline, the usage ledger).
+    Commits on success, rolls back on error. On SQLite the blocks are serialised through a
+    process-wide lock and take the database write lock up front (BEGIN IMMEDIATE), so a
+    block that reads before it writes never fails to upgrade its lock; only request-path
+    writers still contend, via busy_timeout. Keep the block free of slow work, and enter
+    it from async code through asyncio.to_thread.
+    """
+    with _write_lock or nullcontext():
+        db = SessionLocal()
+        try:
+            if IS_SQLITE:
+                db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
 def init_db():
-    from models import User, Case, AnalysisReport  # noqa: F401
+    from models import (  # noqa: F401
+        User, Case, AnalysisReport, AnonymizedParagraph, CaseSignature, CaseLshBucket, WatchlistTerm, CaseStage,
+        UsageLedgerEntry,
+    )
+    import services.search  # noqa: F401  (registers the full-text index DDL)
+    from sqlalchemy import inspect
+
+    from migrations import upgrade
+
+    fresh = not inspect(engine).has_table("users")
     Base.metadata.create_all(bind=engine)
+    upgrade(engine, fresh=fresh)
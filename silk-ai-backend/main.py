@@ -1,11 +1,15 @@
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
 from database import init_db
-from routers import auth, cases, analysis
+from services import metrics
+from services.executors import shutdown_pools
+from responses import ORJSONResponse
+from routers import auth, cases, analysis, watchlist, usage
 
 logging.basicConfig(level=getattr(logging, settings.log_level, logging.INFO))
 logger = logging.getLogger(__name__)
@@ -16,8 +20,25 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.app_env != "production" else None,
     redoc_url="/redoc" if settings.app_env != "production" else None,
+    default_response_class=ORJSONResponse,
 )
 
+try:
+    from brotli_asgi import BrotliMiddleware
+
+    # Falls back to gzip for clients that don't advertise br; PDFs and ZIPs are already compressed
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_fallback=True,
+        excluded_handlers=[r"/pdf$", r"^/analysis/export$"],
+    )
+except ImportError:
+    from fastapi.middleware.gzip import GZipMiddleware
+
+    logger.warning("brotli-asgi not installed — using gzip-only response compression")
+    app.add_middleware(GZipMiddleware, minimum_size=settings.compression_minimum_size, compresslevel=6)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000", "https://*.vercel.app"],
@@ -29,6 +50,8 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(cases.router)
 app.include_router(analysis.router)
+app.include_router(watchlist.router)
+app.include_router(usage.router)
 
 
 @app.on_event("startup")
@@ -37,6 +60,22 @@ def on_startup():
     logger.info("Silk AI backend started")
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_pools()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "silk-ai"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint(authorization: str = Header(default="")):
+    if settings.metrics_token:
+        if authorization != f"Bearer {settings.metrics_token}":
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif settings.app_env != "development":
+        # Scheduler gauges are labelled by tenant (firm names, user ids): never serve them anonymously
+        raise HTTPException(status_code=401, detail="Metrics require METRICS_TOKEN outside development")
+    return metrics.render()
@@ -0,0 +1,37 @@
+"""
+Alembic revisions for changes to existing tables.
+
+init_db() creates any table missing from the database straight from the models, so a
+table new in a release arrives in its current shape, then calls upgrade() to bring the
+tables that already existed to the head revision. A database created before Alembic was
+adopted has no alembic_version table and is stamped at the baseline revision first; a
+freshly created one is stamped at head. From the backend directory, ``alembic upgrade
+head`` and ``alembic revision -m ...`` work as usual.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+# Schema of the first release, before any revision
+BASELINE_REVISION = "0001"
+
+
+def _config(connection) -> Config:
+    config = Config()
+    config.set_main_option("script_location", os.path.dirname(__file__))
+    config.attributes["connection"] = connection
+    return config
+
+
+def upgrade(engine, fresh: bool = False) -> None:
+    """Run after create_all; ``fresh`` means create_all built every table, so there is nothing to migrate."""
+    with engine.begin() as conn:
+        config = _config(conn)
+        if fresh:
+            command.stamp(config, "head")
+            return
+        if not inspect(conn).has_table("alembic_version"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
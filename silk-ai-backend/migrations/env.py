@@ -0,0 +1,39 @@
+from alembic import context
+
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from column_types import CompressedJSON, CompressedText
+from database import Base, engine
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # The full-text index is raw DDL owned by services.search, not part of the models
+    return not (type_ == "table" and name.startswith("case_search"))
+
+
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    # Compressed columns keep their original TEXT/JSON declaration and accept both forms on read
+    if isinstance(metadata_type, (CompressedText, CompressedJSON)):
+        return False
+    return None
+
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        include_name=include_name,
+        compare_type=compare_type,
+        # SQLite can't alter most constraints in place; batch operations rebuild the table instead
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+# init_db() passes the connection it is already using; the alembic CLI does not
+connection = context.config.attributes.get("connection")
+if connection is not None:
+    run_migrations(connection)
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
@@ -0,0 +1,66 @@
+"""Baseline: users, cases and analysis_reports as in the first release
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("firm", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_table(
+        "cases",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("brief_raw", sa.Text(), nullable=False),
+        sa.Column("brief_anonymized", sa.Text(), nullable=True),
+        sa.Column("case_type", sa.String(), nullable=True),
+        sa.Column("jurisdiction", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "analysis_reports",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("case_id", sa.String(), sa.ForeignKey("cases.id"), nullable=False, unique=True),
+        sa.Column("recommended_argument_style", sa.Text(), nullable=True),
+        sa.Column("argument_style_rationale", sa.Text(), nullable=True),
+        sa.Column("barrister_profiles", sa.JSON(), nullable=True),
+        sa.Column("ruling_prediction", sa.Text(), nullable=True),
+        sa.Column("ruling_confidence", sa.Float(), nullable=True),
+        sa.Column("precedent_cases", sa.JSON(), nullable=True),
+        sa.Column("argument_scores", sa.JSON(), nullable=True),
+        sa.Column("overall_strength", sa.Float(), nullable=True),
+        sa.Column("recommended_approach", sa.Text(), nullable=True),
+        sa.Column("opposition_arguments", sa.JSON(), nullable=True),
+        sa.Column("risk_areas", sa.JSON(), nullable=True),
+        sa.Column("preparation_steps", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analysis_reports")
+    op.drop_table("cases")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
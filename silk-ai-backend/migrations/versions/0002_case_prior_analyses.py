@@ -0,0 +1,23 @@
+"""Add cases.use_prior_analyses
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:01:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cases", sa.Column("use_prior_analyses", sa.Boolean(), nullable=True, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("cases") as batch_op:
+        batch_op.drop_column("use_prior_analyses")
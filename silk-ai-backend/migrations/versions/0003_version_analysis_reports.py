@@ -0,0 +1,59 @@
+"""Version analysis reports
+
+Adds version/is_current/model/prompt_version and replaces the UNIQUE (case_id)
+constraint with a unique index over current reports only. Existing reports
+become version 1 and current.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:02:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# SQLite reflects the baseline constraint without a name; this convention names it
+_NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _legacy_unique_name() -> str:
+    if op.get_bind().dialect.name == "sqlite":
+        return "uq_analysis_reports_case_id"
+    return "analysis_reports_case_id_key"  # PostgreSQL's default name
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("analysis_reports", naming_convention=_NAMING_CONVENTION) as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        batch_op.add_column(sa.Column("is_current", sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.add_column(sa.Column("model", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("prompt_version", sa.String(), nullable=True))
+        batch_op.drop_constraint(_legacy_unique_name(), type_="unique")
+    op.create_index("ix_analysis_reports_case_id", "analysis_reports", ["case_id"])
+    is_current = sa.column("is_current")
+    op.create_index(
+        "uq_analysis_reports_current_case",
+        "analysis_reports",
+        ["case_id"],
+        unique=True,
+        sqlite_where=is_current.is_(True),
+        postgresql_where=is_current.is_(True),
+    )
+
+
+def downgrade() -> None:
+    # Only current reports survive: the old constraint allows one report per case
+    op.execute(sa.text("DELETE FROM analysis_reports WHERE is_current = :false").bindparams(false=False))
+    op.drop_index("uq_analysis_reports_current_case", table_name="analysis_reports")
+    op.drop_index("ix_analysis_reports_case_id", table_name="analysis_reports")
+    with op.batch_alter_table("analysis_reports", naming_convention=_NAMING_CONVENTION) as batch_op:
+        batch_op.create_unique_constraint(_legacy_unique_name(), ["case_id"])
+        batch_op.drop_column("prompt_version")
+        batch_op.drop_column("model")
+        batch_op.drop_column("is_current")
+        batch_op.drop_column("version")
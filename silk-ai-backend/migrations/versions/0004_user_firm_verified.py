@@ -0,0 +1,24 @@
+"""Add users.firm_verified
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:03:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing users start unverified, like new registrations
+    op.add_column("users", sa.Column("firm_verified", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("firm_verified")
@@ -0,0 +1,23 @@
+"""Add cases.run_id
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:04:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cases", sa.Column("run_id", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("cases") as batch_op:
+        batch_op.drop_column("run_id")
@@ -1,9 +1,12 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Float, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, String, Text, DateTime, ForeignKey, Float, Boolean, Integer, BigInteger, LargeBinary, Index,
+)
+from sqlalchemy.orm import deferred, relationship
 
+from column_types import CompressedJSON, CompressedText
 from database import Base
 
 
@@ -19,11 +22,18 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     firm = Column(String, nullable=True)
+    # ``firm`` is self-declared at registration; an operator confirms it (cli.py verify-firm-member)
+    firm_verified = Column(Boolean, nullable=False, default=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     cases = relationship("Case", back_populates="owner")
 
+    @property
+    def verified_firm(self):
+        """The user's firm once membership is confirmed, else None. Gate all firm-wide access on this."""
+        return self.firm if self.firm and self.firm_verified else None
+
 
 class Case(Base):
     __tablename__ = "cases"
@@ -31,46 +41,154 @@ class Case(Base):
     id = Column(String, primary_key=True, default=gen_uuid)
     owner_id = Column(String, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=False)
-    brief_raw = Column(Text, nullable=False)
-    brief_anonymized = Column(Text, nullable=True)
+    # Compressed, and only loaded (and decompressed) when accessed
+    brief_raw = deferred(Column(CompressedText, nullable=False))
+    brief_anonymized = deferred(Column(CompressedText, nullable=True))
     case_type = Column(String, nullable=True)
     jurisdiction = Column(String, nullable=True)
     status = Column(String, default="pending")  # pending, processing, complete, failed
+    use_prior_analyses = Column(Boolean, default=False)
+    # Token of the latest scheduled processing run; a run that finds it changed stops
+    run_id = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="cases")
-    report = relationship("AnalysisReport", back_populates="case", uselist=False)
+    reports = relationship("AnalysisReport", back_populates="case", order_by="AnalysisReport.version")
+    # The report served by the API; earlier versions stay in ``reports``
+    report = relationship(
+        "AnalysisReport",
+        primaryjoin="and_(Case.id == AnalysisReport.case_id, AnalysisReport.is_current == True)",
+        uselist=False,
+        viewonly=True,
+    )
+    stages = relationship("CaseStage", order_by="CaseStage.position", cascade="all, delete-orphan")
 
 
 class AnalysisReport(Base):
     __tablename__ = "analysis_reports"
 
     id = Column(String, primary_key=True, default=gen_uuid)
-    case_id = Column(String, ForeignKey("cases.id"), nullable=False, unique=True)
+    case_id = Column(String, ForeignKey("cases.id"), nullable=False, index=True)
+    version = Column(Integer, nullable=False, default=1)
+    is_current = Column(Boolean, nullable=False, default=True)
+    model = Column(String, nullable=True)
+    prompt_version = Column(String, nullable=True)
 
     # Argument Style Advisor
     recommended_argument_style = Column(Text, nullable=True)
-    argument_style_rationale = Column(Text, nullable=True)
+    argument_style_rationale = Column(CompressedText, nullable=True)
 
     # Barrister Profiles
-    barrister_profiles = Column(JSON, nullable=True)  # list of {name, style, lessons}
+    barrister_profiles = Column(CompressedJSON, nullable=True)  # list of {name, style, lessons}
 
     # Judge Ruling Prediction
     ruling_prediction = Column(Text, nullable=True)
     ruling_confidence = Column(Float, nullable=True)
-    precedent_cases = Column(JSON, nullable=True)
+    precedent_cases = Column(CompressedJSON, nullable=True)
 
     # Argument Strength Scoring
-    argument_scores = Column(JSON, nullable=True)  # list of {argument, score, weakness, pivot}
+    argument_scores = Column(CompressedJSON, nullable=True)  # list of {argument, score, weakness, pivot}
     overall_strength = Column(Float, nullable=True)
 
     # Case Strategy Report
-    recommended_approach = Column(Text, nullable=True)
-    opposition_arguments = Column(JSON, nullable=True)
-    risk_areas = Column(JSON, nullable=True)
-    preparation_steps = Column(JSON, nullable=True)
+    recommended_approach = Column(CompressedText, nullable=True)
+    opposition_arguments = Column(CompressedJSON, nullable=True)
+    risk_areas = Column(CompressedJSON, nullable=True)
+    preparation_steps = Column(CompressedJSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    case = relationship("Case", back_populates="reports")
+
+    __table_args__ = (
+        # At most one current report per case
+        Index(
+            "uq_analysis_reports_current_case",
+            "case_id",
+            unique=True,
+            sqlite_where=is_current.is_(True),
+            postgresql_where=is_current.is_(True),
+        ),
+    )
+
+
+class AnonymizedParagraph(Base):
+    """Paragraph-level anonymization cache, keyed by content hash of the raw paragraph."""
+    __tablename__ = "anonymized_paragraphs"
+
+    owner_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    anonymized = Column(CompressedText, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CaseSignature(Base):
+    """MinHash signature of a case's anonymized brief (see services.similarity)."""
+    __tablename__ = "case_signatures"
+
+    case_id = Column(String, ForeignKey("cases.id"), primary_key=True)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    signature = Column(LargeBinary, nullable=False)
 
+
+class CaseLshBucket(Base):
+    """LSH band bucket membership; the primary key doubles as the lookup index."""
+    __tablename__ = "case_lsh_buckets"
+
+    owner_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    case_id = Column(String, ForeignKey("cases.id"), primary_key=True, index=True)
+
+
+class WatchlistTerm(Base):
+    """A name that must always be redacted. Firm-scoped terms apply to every user of that firm."""
+    __tablename__ = "watchlist_terms"
+
+    id = Column(String, primary_key=True, default=gen_uuid)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    firm = Column(String, nullable=True, index=True)
+    term = Column(String, nullable=False)
+    replacement = Column(String, nullable=False, default="[PERSON]")
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    case = relationship("Case", back_populates="report")
+
+class CaseStage(Base):
+    """Checkpoint for one pipeline stage of a case (see services.stages)."""
+    __tablename__ = "case_stages"
+
+    case_id = Column(String, ForeignKey("cases.id"), primary_key=True)
+    stage = Column(String, primary_key=True)  # anonymized, analysed, persisted
+    position = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running, complete, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    output = Column(CompressedJSON, nullable=True)  # analysis result, kept until it is persisted
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class UsageLedgerEntry(Base):
+    """One Claude API call: tokens, latency and estimated cost (see services.usage)."""
+    __tablename__ = "usage_ledger"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # No foreign keys: usage stays on the ledger after a case or user is deleted
+    owner_id = Column(String, nullable=True)
+    firm = Column(String, nullable=True)
+    case_id = Column(String, nullable=True, index=True)
+    purpose = Column(String, nullable=False)  # anonymization, analysis
+    model = Column(String, nullable=False)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cache_creation_input_tokens = Column(Integer, nullable=False, default=0)
+    cache_read_input_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_usage_ledger_owner_created", "owner_id", "created_at"),
+        Index("ix_usage_ledger_firm_created", "firm", "created_at"),
+    )
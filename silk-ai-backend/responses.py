@@ -0,0 +1,68 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: orjson is several times faster than json.dumps for large payloads."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def model_response(schema: Type[BaseModel], obj: Any, **kwargs) -> Response:
+    """
+    Validate an ORM row straight into ``schema`` and serialise it to JSON bytes in
+    pydantic-core, skipping the intermediate dict that response_model encoding builds.
+    """
+    return Response(
+        content=schema.model_validate(obj).model_dump_json(),
+        media_type="application/json",
+        **kwargs,
+    )
+
+
+def entity_tag(*parts: Any) -> str:
+    """Strong ETag derived from the values that determine a representation."""
+    digest = hashlib.blake2b("\0".join(str(p) for p in parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def cache_headers(
+    etag: str, last_modified: Optional[datetime], cache_control: str = "private, no-cache"
+) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """RFC 9110 precondition check: If-None-Match wins; If-Modified-Since is only consulted without it."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # Weak comparison, as GET requires; compression middleware may have weakened our tag
+        return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -1,31 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
+import asyncio
+import io
+import logging
+import zipfile
+from collections import deque
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from auth import get_current_user
+from config import settings
 from database import get_db
 from models import User, Case, AnalysisReport
-from schemas import AnalysisReportOut
+from responses import cache_headers, entity_tag, is_not_modified, model_response, not_modified
+from schemas import AnalysisReportOut, ReportExportRequest
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
+logger = logging.getLogger(__name__)
+
+_ZIP_CHUNK_SIZE = 64 * 1024
+
+
+@router.post("/export")
+async def export_reports(
+    payload: ReportExportRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream a ZIP of strategy-report PDFs, rendered in parallel and written as each finishes."""
+    case_ids = list(dict.fromkeys(payload.case_ids))
+    if len(case_ids) > settings.pdf_export_max_cases:
+        raise HTTPException(status_code=422, detail=f"At most {settings.pdf_export_max_cases} cases per export")
+
+    rows = (
+        db.query(Case, AnalysisReport)
+        .join(AnalysisReport, (AnalysisReport.case_id == Case.id) & AnalysisReport.is_current.is_(True))
+        .filter(Case.id.in_(case_ids), Case.owner_id == current_user.id, Case.status == "complete")
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No completed analyses found")
+
+    # Everything the renderer needs is captured up front; the DB session is not used while streaming
+    items = [
+        (
+            f"SilkAI_{_safe_title(case.title)}_{case.id[:8]}.pdf",
+            (report.id, case.title, _report_data(report), case.case_type, settings.pdf_cache_dir),
+        )
+        for case, report in rows
+    ]
+
+    return StreamingResponse(
+        _zip_stream(items),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="SilkAI_Reports.zip"'},
+    )
+
 
 @router.get("/{case_id}", response_model=AnalysisReportOut)
 def get_analysis(
     case_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    case = db.query(Case).filter(Case.id == case_id, Case.owner_id == current_user.id).first()
-    if not case:
+    row = (
+        db.query(Case.status, AnalysisReport.id, AnalysisReport.created_at)
+        .outerjoin(AnalysisReport, (AnalysisReport.case_id == Case.id) & AnalysisReport.is_current.is_(True))
+        .filter(Case.id == case_id, Case.owner_id == current_user.id)
+        .first()
+    )
+    if not row:
         raise HTTPException(status_code=404, detail="Case not found")
-    if case.status != "complete":
-        raise HTTPException(status_code=202, detail=f"Analysis status: {case.status}")
-
-    report = db.query(AnalysisReport).filter(AnalysisReport.case_id == case_id).first()
-    if not report:
+    case_status, report_id, created_at = row
+    if case_status != "complete":
+        raise HTTPException(status_code=202, detail=f"Analysis status: {case_status}")
+    if not report_id:
         raise HTTPException(status_code=404, detail="Analysis report not found")
-    return report
+
+    # A report row never changes, so its id is a complete validator. The URL still resolves
+    # to whichever version is current, hence revalidation rather than a max-age.
+    etag = entity_tag(report_id)
+    headers = cache_headers(etag, created_at)
+    if is_not_modified(request, etag, created_at):
+        return not_modified(headers)
+
+    report = db.query(AnalysisReport).filter(AnalysisReport.id == report_id).first()
+    return model_response(AnalysisReportOut, report, headers=headers)
 
 
 @router.get("/{case_id}/pdf")
@@ -40,13 +102,27 @@ def download_pdf(
     if case.status != "complete":
         raise HTTPException(status_code=202, detail="Analysis not yet complete")
 
-    report = db.query(AnalysisReport).filter(AnalysisReport.case_id == case_id).first()
+    report = case.report
     if not report:
         raise HTTPException(status_code=404, detail="Analysis report not found")
 
-    from services.pdf_service import generate_strategy_report_pdf
+    from services.pdf_service import render_cached_pdf
+
+    pdf_path = render_cached_pdf(report.id, case.title, _report_data(report), case.case_type)
+
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename=f"SilkAI_{_safe_title(case.title)}.pdf",
+    )
+
+
+def _safe_title(title: str) -> str:
+    return "".join(c if c.isalnum() or c in " -_" else "_" for c in title)[:50]
+
 
-    report_data = {
+def _report_data(report: AnalysisReport) -> dict:
+    return {
         "argument_style": {
             "recommended_style": report.recommended_argument_style,
             "rationale": report.argument_style_rationale,
@@ -66,11 +142,57 @@ def download_pdf(
         },
     }
 
-    pdf_bytes = generate_strategy_report_pdf(case.title, report_data, case.case_type)
-    safe_title = "".join(c if c.isalnum() or c in " -_" else "_" for c in case.title)[:50]
 
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="SilkAI_{safe_title}.pdf"'},
-    )
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target for ZipFile; bytes are handed to the response as they are produced."""
+
+    def __init__(self):
+        self._chunks = deque()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _zip_stream(items):
+    from services.executors import get_pool, run_in_pool
+    from services.pdf_service import render_cached_pdf
+
+    pool = get_pool("pdf", settings.pdf_render_workers)
+
+    async def render(name, args):
+        return name, await run_in_pool(pool, render_cached_pdf, *args)
+
+    tasks = [asyncio.ensure_future(render(name, args)) for name, args in items]
+    sink = _ChunkSink()
+    try:
+        # PDFs are already compressed internally, so store rather than deflate
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    name, pdf_path = await next_done
+                except Exception as e:
+                    logger.error(f"PDF export: rendering failed: {e}")
+                    continue
+                pdf = await asyncio.to_thread(open, pdf_path, "rb")
+                try:
+                    with archive.open(name, mode="w") as entry:
+                        while chunk := await asyncio.to_thread(pdf.read, _ZIP_CHUNK_SIZE):
+                            entry.write(chunk)
+                            yield sink.drain()
+                finally:
+                    pdf.close()
+                yield sink.drain()
+        yield sink.drain()
+    finally:
+        # Client went away mid-stream: don't keep rendering for nobody
+        for task in tasks:
+            task.cancel()
@@ -1,37 +1,152 @@
-from typing import List
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import partial
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from auth import get_current_user
-from database import get_db
-from models import User, Case, AnalysisReport
-from schemas import CaseCreate, CaseOut, CaseDetail
+from config import settings
+from database import SessionLocal, get_db
+from models import User, Case, AnalysisReport, AnonymizedParagraph, CaseStage, gen_uuid
+from responses import cache_headers, entity_tag, is_not_modified, model_response, not_modified
+from schemas import (
+    CaseCreate, CaseUploadForm, CaseUpdate, CaseOut, CaseDetail, CaseSearchHit, CaseSearchResults, SimilarCase, QueueDepth,
+    AnalysisReportOut,
+)
+from services import metrics, search, similarity, stages, usage
+from services.pdf_service import evict_cached_pdf
+from services.scheduler import scheduler
 
 router = APIRouter(prefix="/cases", tags=["cases"])
 
+logger = logging.getLogger(__name__)
+
+_EXPORT_BATCH_ROWS = 500
+_EXPORT_CHUNK_SIZE = 64 * 1024
+
 
 @router.post("/", response_model=CaseOut, status_code=status.HTTP_201_CREATED)
 async def create_case(
     payload: CaseCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    case = Case(
-        owner_id=current_user.id,
+    return _create_and_schedule(
+        db,
+        current_user,
         title=payload.title,
         brief_raw=payload.brief_raw,
         case_type=payload.case_type,
         jurisdiction=payload.jurisdiction,
-        status="pending",
+        use_prior_analyses=payload.use_prior_analyses,
+    )
+
+
+_UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["title", "files"],
+            "properties": {
+                **{name: {"type": "string"} for name in ("title", "case_type", "jurisdiction")},
+                "use_prior_analyses": {"type": "boolean", "default": False},
+                "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+            },
+        }}},
+    },
+}
+
+
+@router.post(
+    "/upload", response_model=CaseOut, status_code=status.HTTP_201_CREATED, openapi_extra=_UPLOAD_FORM_SCHEMA
+)
+async def upload_case(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Create a case from uploaded PDF/DOCX/text files. The body is streamed to disk and
+    rejected as soon as it passes max_upload_mb (see services.uploads); text is
+    extracted in a bounded process pool, never on the event loop.
+    """
+    from services.executors import get_pool, run_in_pool
+    from services.extraction import SUPPORTED_EXTENSIONS, UnsupportedDocument, extract_text
+    from services.uploads import MalformedUpload, UnsupportedUpload, UploadTooLarge, receive_multipart
+
+    # Before any of the body is read
+    _ensure_budget(db, current_user)
+
+    pool = get_pool("extraction", settings.extraction_workers)
+    texts = []
+    try:
+        async with receive_multipart(request, settings.max_upload_mb * 1024 * 1024, SUPPORTED_EXTENSIONS) as (
+            fields, files
+        ):
+            try:
+                form = CaseUploadForm.model_validate(fields)
+            except ValidationError as e:
+                raise RequestValidationError(e.errors())
+            files = [f for f in files if f.field == "files"]
+            if not files:
+                raise HTTPException(status_code=422, detail="No files uploaded")
+            for upload in files:
+                try:
+                    texts.append(await run_in_pool(pool, extract_text, upload.path, upload.filename))
+                except UnsupportedDocument as e:
+                    raise HTTPException(status_code=415, detail=str(e))
+                except Exception as e:
+                    logger.error(f"Text extraction failed for upload: {e}")
+                    raise HTTPException(status_code=422, detail=f"Could not extract text from {upload.filename}")
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.max_upload_mb} MB")
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except MalformedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    brief_raw = "\n\n".join(t.strip() for t in texts if t.strip())
+    if not brief_raw:
+        raise HTTPException(status_code=422, detail="No text could be extracted from the uploaded files")
+
+    return _create_and_schedule(
+        db,
+        current_user,
+        title=form.title,
+        brief_raw=brief_raw,
+        case_type=form.case_type,
+        jurisdiction=form.jurisdiction,
+        use_prior_analyses=form.use_prior_analyses,
     )
+
+
+def _ensure_budget(db: Session, user: User):
+    try:
+        usage.check_budget(db, user.id, user.verified_firm)
+    except usage.BudgetExceeded as e:
+        raise HTTPException(status_code=402, detail=str(e))
+
+
+def _create_and_schedule(db: Session, current_user: User, **fields) -> Case:
+    _ensure_budget(db, current_user)
+    case = Case(owner_id=current_user.id, status="pending", run_id=gen_uuid(), **fields)
     db.add(case)
+    db.flush()
+    search.index_case(db, case)
     db.commit()
     db.refresh(case)
 
-    # Kick off anonymization + analysis in background
-    background_tasks.add_task(_process_case, case.id)
+    # Kick off anonymization + analysis in background, fair-shared across firms
+    scheduler.submit(case.id, current_user.id, current_user.verified_firm, partial(_process_case, case.id, case.run_id))
 
     return case
 
@@ -41,18 +156,224 @@ def list_cases(db: Session = Depends(get_db), current_user: User = Depends(get_c
     return db.query(Case).filter(Case.owner_id == current_user.id).order_by(Case.created_at.desc()).all()
 
 
+@router.get("/queue", response_model=QueueDepth)
+def queue_depth(current_user: User = Depends(get_current_user)):
+    return scheduler.depth(current_user.id, current_user.verified_firm)
+
+
+@router.get("/export")
+def export_cases(current_user: User = Depends(get_current_user)):
+    """
+    Stream every case with its current report as NDJSON, one object per line.
+    A single joined query is read in batches, so memory use does not grow with the number of cases.
+    """
+    return StreamingResponse(
+        _export_lines(current_user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="SilkAI_Cases.ndjson"'},
+    )
+
+
+_EXPORT_CASE_FIELDS = [*CaseOut.model_fields, "brief_anonymized"]
+_EXPORT_REPORT_FIELDS = list(AnalysisReportOut.model_fields)
+
+
+def _export_lines(owner_id: str):
+    query = (
+        select(
+            *(getattr(Case, f).label(f) for f in _EXPORT_CASE_FIELDS),
+            *(getattr(AnalysisReport, f).label(f"report_{f}") for f in _EXPORT_REPORT_FIELDS),
+        )
+        .outerjoin(AnalysisReport, (AnalysisReport.case_id == Case.id) & AnalysisReport.is_current.is_(True))
+        .where(Case.owner_id == owner_id)
+        .order_by(Case.created_at, Case.id)
+        .execution_options(stream_results=True, yield_per=_EXPORT_BATCH_ROWS)
+    )
+    # Own session: the request-scoped one is not guaranteed to outlive the response body
+    db = SessionLocal()
+    try:
+        buffer = bytearray()
+        for row in db.execute(query):
+            values = row._mapping
+            record = {f: values[f] for f in _EXPORT_CASE_FIELDS}
+            record["report"] = (
+                {f: values[f"report_{f}"] for f in _EXPORT_REPORT_FIELDS} if values["report_id"] is not None else None
+            )
+            buffer += orjson.dumps(record)
+            buffer += b"\n"
+            if len(buffer) >= _EXPORT_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        db.close()
+
+
+@router.get("/search", response_model=CaseSearchResults)
+def search_cases(
+    q: str = Query(..., min_length=1, max_length=500),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    total, hits = search.search_cases(db, current_user.id, q, limit=page_size, offset=(page - 1) * page_size)
+    cases = {c.id: c for c in db.query(Case).filter(Case.id.in_([case_id for case_id, _, _ in hits]))}
+    return CaseSearchResults(
+        total=total,
+        page=page,
+        page_size=page_size,
+        hits=[
+            CaseSearchHit(case=CaseOut.model_validate(cases[case_id]), snippet=snippet, score=score)
+            for case_id, snippet, score in hits
+            if case_id in cases
+        ],
+    )
+
+
 @router.get("/{case_id}", response_model=CaseDetail)
 def get_case(
     case_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Validators come from one indexed lookup; a matching If-None-Match never loads the case
+    stage_changed = (
+        select(func.max(func.coalesce(CaseStage.finished_at, CaseStage.started_at)))
+        .where(CaseStage.case_id == Case.id)
+        .scalar_subquery()
+    )
+    version = (
+        db.query(Case.updated_at, AnalysisReport.id, stage_changed)
+        .outerjoin(AnalysisReport, (AnalysisReport.case_id == Case.id) & AnalysisReport.is_current.is_(True))
+        .filter(Case.id == case_id, Case.owner_id == current_user.id)
+        .first()
+    )
+    if not version:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    updated_at, report_id, stage_changed_at = version
+    last_modified = max(t for t in (updated_at, stage_changed_at) if t is not None)
+    etag = entity_tag(case_id, updated_at.isoformat(), report_id, stage_changed_at and stage_changed_at.isoformat())
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
+
+    case = db.query(Case).filter(Case.id == case_id).first()
+    return model_response(CaseDetail, case, headers=headers)
+
+
+@router.get("/{case_id}/similar", response_model=List[SimilarCase])
+def similar_cases(
+    case_id: str,
+    limit: int = Query(5, ge=1, le=20),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     case = db.query(Case).filter(Case.id == case_id, Case.owner_id == current_user.id).first()
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
+
+    matches = similarity.find_similar(db, case, limit=limit)
+    if matches is None:
+        raise HTTPException(status_code=409, detail=f"Case not yet anonymized: {case.status}")
+
+    cases = {c.id: c for c in db.query(Case).filter(Case.id.in_([m for m, _ in matches]))}
+    return [
+        SimilarCase(case=CaseOut.model_validate(cases[match_id]), similarity=score, report=cases[match_id].report)
+        for match_id, score in matches
+        if match_id in cases
+    ]
+
+
+@router.patch("/{case_id}", response_model=CaseOut)
+async def update_case(
+    case_id: str,
+    payload: CaseUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    case = db.query(Case).filter(Case.id == case_id, Case.owner_id == current_user.id).first()
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+    if _in_flight(case):
+        raise HTTPException(status_code=409, detail="Case is still being processed")
+
+    changes = payload.model_dump(exclude_none=True)
+    needs_reanalysis = any(
+        field in changes and changes[field] != getattr(case, field)
+        for field in ("brief_raw", "case_type", "jurisdiction")
+    )
+    if needs_reanalysis:
+        _ensure_budget(db, current_user)
+    if any(field in changes and changes[field] != getattr(case, field) for field in ("title", "case_type")):
+        # Renderings under the old heading would never be served again
+        for report in case.reports:
+            evict_cached_pdf(report.id)
+    for field, value in changes.items():
+        setattr(case, field, value)
+
+    if needs_reanalysis:
+        # Unchanged paragraphs are served from the anonymization cache in _process_case;
+        # the current report stays in place until the new version replaces it
+        case.status = "pending"
+        case.run_id = gen_uuid()
+        stages.reset(db, case.id)
+    search.index_case(db, case)
+    db.commit()
+    db.refresh(case)
+
+    if needs_reanalysis:
+        scheduler.submit(case.id, current_user.id, current_user.verified_firm, partial(_process_case, case.id, case.run_id))
+
     return case
 
 
+@router.post("/{case_id}/retry", response_model=CaseOut, status_code=status.HTTP_202_ACCEPTED)
+async def retry_case(
+    case_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Resume a failed or stalled case from its last completed stage."""
+    case = db.query(Case).filter(Case.id == case_id, Case.owner_id == current_user.id).first()
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+    if case.status not in ("failed", "pending", "processing") or _in_flight(case):
+        raise HTTPException(
+            status_code=409, detail=f"Only failed or stalled cases can be retried (status: {case.status})"
+        )
+    _ensure_budget(db, current_user)
+
+    # A stalled run left its stage marked running
+    stages.fail_running(db, case.id, "Interrupted before completion")
+    case.status = "pending"
+    case.run_id = gen_uuid()
+    db.commit()
+    db.refresh(case)
+    scheduler.submit(case.id, current_user.id, current_user.verified_firm, partial(_process_case, case.id, case.run_id))
+    return case
+
+
+def _in_flight(case: Case) -> bool:
+    """
+    Whether a pending or processing case is still being worked on. A restart loses the
+    scheduler's jobs, leaving such cases stuck; once one is held by no local job and has
+    been idle for longer than the processing deadline (which bounds every live run), it
+    is treated as stalled and can be retried or edited. A case still queued on another
+    worker for that long can be resubmitted too; resubmitting issues a new Case.run_id,
+    so the original job stops as soon as it starts (see _current_case).
+    """
+    if case.status not in ("pending", "processing"):
+        return False
+    if scheduler.holds(case.id):
+        return True
+    last_activity = case.updated_at or case.created_at
+    return datetime.utcnow() - last_activity < timedelta(seconds=settings.case_processing_timeout_seconds)
+
+
 @router.delete("/{case_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_case(
     case_id: str,
@@ -62,71 +383,263 @@ def delete_case(
     case = db.query(Case).filter(Case.id == case_id, Case.owner_id == current_user.id).first()
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
+    # Stop any in-flight processing so it doesn't keep spending tokens on a deleted case
+    if scheduler.cancel(case.id):
+        metrics.inc("silk_case_cancellations_total", reason="deleted")
+    search.remove_case(db, case.id)
+    similarity.remove_case(db, case.id)
+    _purge_paragraph_cache(db, case)
+    for report in case.reports:
+        evict_cached_pdf(report.id)
+        db.delete(report)
     db.delete(case)
     db.commit()
 
 
-async def _process_case(case_id: str):
-    """Background task: anonymize brief and run Claude analysis."""
-    from database import SessionLocal
-    from services.anonymization import anonymize
-    from services.claude_service import get_client, analyse_case
+async def _process_case(case_id: str, run_id: str):
+    """
+    Background task: anonymize brief and run Claude analysis.
+    The whole pipeline runs under one deadline budget; deleting the case cancels it
+    through the scheduler, which aborts any in-flight Claude calls. ``run_id`` is the
+    Case.run_id issued when this run was scheduled; once it is superseded the run stops.
+    """
+    from database import write_session
 
-    db = SessionLocal()
+    progress = {"stage": "queued"}
     try:
-        case = db.query(Case).filter(Case.id == case_id).first()
-        if not case:
-            return
+        outcome = await asyncio.wait_for(
+            _run_pipeline(case_id, run_id, progress), timeout=settings.case_processing_timeout_seconds
+        )
+        metrics.inc("silk_case_processing_total", outcome=outcome)
+        return
+    except asyncio.TimeoutError:
+        logger.error(f"Case processing timed out for {case_id} during {progress['stage']}")
+        metrics.inc("silk_case_processing_total", outcome="timeout")
+        metrics.inc("silk_case_processing_timeouts_total", stage=progress["stage"])
+        error = f"Timed out after {settings.case_processing_timeout_seconds}s"
+    except asyncio.CancelledError:
+        logger.info(f"Case processing cancelled for {case_id} during {progress['stage']}")
+        metrics.inc("silk_case_processing_total", outcome="cancelled")
+        raise
+    except usage.BudgetExceeded as e:
+        logger.warning(f"Case processing stopped for {case_id}: {e}")
+        metrics.inc("silk_case_processing_total", outcome="budget_exceeded")
+        error = str(e)
+    except Exception as e:
+        logger.error(f"Case processing failed for {case_id}: {e}")
+        metrics.inc("silk_case_processing_total", outcome="failed")
+        error = str(e) or type(e).__name__
 
-        case.status = "processing"
-        db.commit()
+    def mark_failed():
+        with write_session() as db:
+            case = _current_case(db, case_id, run_id)
+            if case:
+                case.status = "failed"
+                stages.fail_running(db, case_id, error)
 
-        # Step 1: Anonymize
+    await asyncio.to_thread(mark_failed)
+
+
+def _current_case(db: Session, case_id: str, run_id: str) -> Optional[Case]:
+    """The case, unless it was deleted or rescheduled (see Case.run_id) since this run began."""
+    case = db.query(Case).filter(Case.id == case_id).first()
+    if case is None or case.run_id != run_id:
+        return None
+    return case
+
+
+async def _run_pipeline(case_id: str, run_id: str, progress: dict) -> str:
+    """
+    Database work happens in short write_session() blocks between the slow
+    Claude calls, so no connection or SQLite write lock is held while waiting.
+    The blocks run in threads (waiting on busy_timeout, decompressing the cache, indexing)
+    and CPU-heavy steps run in the NER worker processes, so the event loop stays free.
+    Stages already completed by an earlier attempt are skipped (see services.stages).
+    Returns the outcome label for metrics.
+    """
+    from database import write_session
+    from services.anonymization import anonymize_incremental, offload
+    from services.claude_service import get_client, analyse_case
+    from services.reports import save_report
+    from services.watchlist import load_watchlist
+
+    def begin() -> Optional[dict]:
+        with write_session() as db:
+            case = _current_case(db, case_id, run_id)
+            if not case or case.status == "complete":
+                return None
+            case.status = "processing"
+            job = {
+                "owner_id": case.owner_id,
+                "brief_raw": case.brief_raw,
+                "case_type": case.case_type,
+                "jurisdiction": case.jurisdiction,
+                "use_prior_analyses": case.use_prior_analyses,
+                # Firm spend and budgets only apply once membership is confirmed (see User.verified_firm)
+                "firm": case.owner.verified_firm,
+                "prior_context": None,
+            }
+
+            done = stages.completed(db, case_id)
+            job["anonymized"] = case.brief_anonymized if stages.ANONYMIZED in done else None
+            job["result"] = done.get(stages.ANALYSED) if job["anonymized"] is not None else None
+            if job["anonymized"] is None:
+                job["watchlist"] = load_watchlist(db, case.owner)
+                job["cache"] = _load_paragraph_cache(
+                    db, job["owner_id"], job["brief_raw"], job["watchlist"].fingerprint
+                )
+                stages.start(db, case_id, stages.ANONYMIZED)
+            elif job["result"] is None:
+                if job["use_prior_analyses"]:
+                    job["prior_context"] = similarity.build_prior_context(db, case)
+                stages.start(db, case_id, stages.ANALYSED)
+            else:
+                stages.start(db, case_id, stages.PERSISTED)
+            return job
+
+    job = await asyncio.to_thread(begin)
+    if job is None:
+        return "cancelled"
+    owner_id, firm = job["owner_id"], job["firm"]
+    anonymized, result, prior_context = job["anonymized"], job["result"], job["prior_context"]
+
+    # Claude calls made from here on (including concurrent verification calls) are charged to this case
+    usage.attribute_to(owner_id, firm, case_id)
+
+    # Step 1: Anonymize (only paragraphs missing from the cache)
+    if anonymized is None:
+        progress["stage"] = "anonymization"
+        await asyncio.to_thread(_check_budget, owner_id, firm)
         client = get_client()
-        anonymized = await anonymize(case.brief_raw, client)
-        case.brief_anonymized = anonymized
-        db.commit()
-
-        # Step 2: Claude analysis (anonymized text only)
-        result = await analyse_case(anonymized, case.case_type, case.jurisdiction)
-
-        # Step 3: Persist report
-        arg_style = result.get("argument_style", {})
-        judge_pred = result.get("judge_prediction", {})
-        strat = result.get("strategy_report", {})
-
-        report = AnalysisReport(
-            case_id=case.id,
-            recommended_argument_style=arg_style.get("recommended_style"),
-            argument_style_rationale=arg_style.get("rationale"),
-            barrister_profiles=result.get("barrister_profiles", []),
-            ruling_prediction=judge_pred.get("prediction"),
-            ruling_confidence=judge_pred.get("confidence"),
-            precedent_cases=judge_pred.get("precedent_cases", []),
-            argument_scores=result.get("argument_scores", []),
-            overall_strength=_calc_overall_strength(result.get("argument_scores", [])),
-            recommended_approach=strat.get("recommended_approach"),
-            opposition_arguments=strat.get("opposition_arguments", []),
-            risk_areas=strat.get("risk_areas", []),
-            preparation_steps=strat.get("preparation_steps", []),
+        anonymized, new_entries = await anonymize_incremental(
+            job["brief_raw"], client, job["cache"], job["watchlist"]
         )
-        db.add(report)
-        case.status = "complete"
-        db.commit()
+        signature = await offload(similarity.minhash_signature, anonymized)
 
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).error(f"Case processing failed for {case_id}: {e}")
-        case = db.query(Case).filter(Case.id == case_id).first()
-        if case:
-            case.status = "failed"
-            db.commit()
+        def store_anonymized():
+            with write_session() as db:
+                case = _current_case(db, case_id, run_id)
+                if not case:
+                    # Deleted or rescheduled from another worker, where the scheduler cannot reach this task
+                    return False, None
+                _store_paragraph_cache(db, owner_id, new_entries)
+                case.brief_anonymized = anonymized
+                search.index_case(db, case)
+                similarity.store_signature(db, case, signature)
+                db.flush()
+                context = similarity.build_prior_context(db, case) if job["use_prior_analyses"] else None
+                stages.complete(db, case_id, stages.ANONYMIZED)
+                stages.start(db, case_id, stages.ANALYSED)
+                return True, context
+
+        stored, prior_context = await asyncio.to_thread(store_anonymized)
+        if not stored:
+            return "cancelled"
+
+    # Step 2: Claude analysis (anonymized text only)
+    if result is None:
+        progress["stage"] = "analysis"
+        await asyncio.to_thread(_check_budget, owner_id, firm)
+        result = await analyse_case(anonymized, job["case_type"], job["jurisdiction"], prior_context)
+
+        def store_analysis():
+            with write_session() as db:
+                if _current_case(db, case_id, run_id) is None:
+                    return False
+                # Kept until persisted, so a failed save is retried without another Claude call
+                stages.complete(db, case_id, stages.ANALYSED, output=result)
+                stages.start(db, case_id, stages.PERSISTED)
+                return True
+
+        if not await asyncio.to_thread(store_analysis):
+            return "cancelled"
+
+    # Step 3: Persist report
+    progress["stage"] = "persist"
+
+    def persist():
+        with write_session() as db:
+            case = _current_case(db, case_id, run_id)
+            if not case:
+                return False
+            save_report(db, case, result)
+            stages.complete(db, case_id, stages.PERSISTED)
+            stages.discard_output(db, case_id, stages.ANALYSED)
+            return True
+
+    return "complete" if await asyncio.to_thread(persist) else "cancelled"
+
+
+def _check_budget(owner_id: str, firm: Optional[str]):
+    """Re-checked before each paid stage, so a case queued under budget can't overrun it."""
+    db = SessionLocal()
+    try:
+        usage.check_budget(db, owner_id, firm)
     finally:
         db.close()
 
 
-def _calc_overall_strength(argument_scores: list) -> float:
-    if not argument_scores:
-        return 0.0
-    scores = [float(a.get("score", 0)) for a in argument_scores]
-    return round(sum(scores) / len(scores), 2)
+def _paragraph_cache_cutoff() -> Optional[datetime]:
+    """Entries created before this are expired (see settings.anonymization_cache_days)."""
+    if settings.anonymization_cache_days <= 0:
+        return None
+    return datetime.utcnow() - timedelta(days=settings.anonymization_cache_days)
+
+
+def _load_paragraph_cache(db: Session, owner_id: str, text: str, salt: str = "") -> dict:
+    from services.anonymization import paragraph_hashes
+
+    hashes = list(dict.fromkeys(paragraph_hashes(text, salt)))
+    cutoff = _paragraph_cache_cutoff()
+    cache = {}
+    for i in range(0, len(hashes), 500):
+        query = db.query(AnonymizedParagraph.content_hash, AnonymizedParagraph.anonymized).filter(
+            AnonymizedParagraph.owner_id == owner_id,
+            AnonymizedParagraph.content_hash.in_(hashes[i : i + 500]),
+        )
+        if cutoff is not None:
+            # Expired rows may linger until `cli.py purge-paragraph-cache` runs; never serve them
+            query = query.filter(AnonymizedParagraph.created_at >= cutoff)
+        cache.update(query.all())
+    return cache
+
+
+def _purge_paragraph_cache(db: Session, case: Case):
+    """
+    Drop the cached paragraphs of a deleted case. Entries are shared by content hash across the
+    owner's cases, so another case may lose a cache hit; entries keyed under an earlier watchlist
+    fingerprint are left to expire.
+    """
+    from services.anonymization import paragraph_hashes
+    from services.watchlist import load_watchlist
+
+    salt = load_watchlist(db, case.owner).fingerprint
+    hashes = list(dict.fromkeys(paragraph_hashes(case.brief_raw, salt)))
+    for i in range(0, len(hashes), 500):
+        db.query(AnonymizedParagraph).filter(
+            AnonymizedParagraph.owner_id == case.owner_id,
+            AnonymizedParagraph.content_hash.in_(hashes[i : i + 500]),
+        ).delete(synchronize_session=False)
+
+
+def _store_paragraph_cache(db: Session, owner_id: str, entries: dict):
+    if not entries:
+        return
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    rows = [
+        {"owner_id": owner_id, "content_hash": key, "anonymized": value, "created_at": now}
+        for key, value in entries.items()
+    ]
+    # Another case from the same owner may have cached the same paragraph concurrently, or an
+    # expired entry may still be present; either way the fresh result replaces it
+    for i in range(0, len(rows), 500):
+        statement = insert(AnonymizedParagraph).values(rows[i : i + 500])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[AnonymizedParagraph.owner_id, AnonymizedParagraph.content_hash],
+            set_={"anonymized": statement.excluded.anonymized, "created_at": statement.excluded.created_at},
+        ))
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from auth import get_current_user
+from config import settings
+from database import get_db
+from models import User, UsageLedgerEntry
+from schemas import BudgetStatus, UsageGroup, UsageReport, UsageTotals
+from services import usage
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+_TOTALS = [
+    func.count(UsageLedgerEntry.id).label("calls"),
+    func.coalesce(func.sum(UsageLedgerEntry.input_tokens), 0).label("input_tokens"),
+    func.coalesce(func.sum(UsageLedgerEntry.output_tokens), 0).label("output_tokens"),
+    func.coalesce(func.sum(UsageLedgerEntry.cache_creation_input_tokens), 0).label("cache_creation_input_tokens"),
+    func.coalesce(func.sum(UsageLedgerEntry.cache_read_input_tokens), 0).label("cache_read_input_tokens"),
+    func.coalesce(func.sum(UsageLedgerEntry.cost_usd), 0.0).label("cost_usd"),
+]
+_GROUP_KEYS = {
+    "day": func.date(UsageLedgerEntry.created_at),
+    "model": UsageLedgerEntry.model,
+    "purpose": UsageLedgerEntry.purpose,
+    "case": UsageLedgerEntry.case_id,
+    "user": UsageLedgerEntry.owner_id,
+}
+
+
+def _report(db: Session, scope, since: Optional[datetime], until: Optional[datetime], group_by: str) -> UsageReport:
+    since = since or usage.period_start()
+    until = until or datetime.utcnow()
+    # Every query is a range scan on the (owner_id|firm, created_at) index
+    base = db.query(UsageLedgerEntry).filter(
+        scope, UsageLedgerEntry.created_at >= since, UsageLedgerEntry.created_at < until
+    )
+    total = base.with_entities(*_TOTALS).one()
+    key = _GROUP_KEYS[group_by]
+    groups = base.with_entities(key.label("key"), *_TOTALS).group_by(key).order_by(key).all()
+    return UsageReport(
+        since=since,
+        until=until,
+        total=UsageTotals(**total._mapping),
+        groups=[UsageGroup(**{**row._mapping, "key": None if row.key is None else str(row.key)}) for row in groups],
+    )
+
+
+@router.get("/", response_model=UsageReport)
+def my_usage(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    group_by: Literal["day", "model", "purpose", "case"] = Query("day"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Claude usage charged to the current user; the window defaults to the current budget month."""
+    return _report(db, UsageLedgerEntry.owner_id == current_user.id, since, until, group_by)
+
+
+@router.get("/firm", response_model=UsageReport)
+def firm_usage(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    group_by: Literal["day", "model", "purpose", "user"] = Query("day"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Claude usage across the caller's firm, for verified members only (User.firm is self-declared).
+    Not broken down by case, which would expose colleagues' matters.
+    """
+    if not current_user.verified_firm:
+        raise HTTPException(status_code=403, detail="Firm usage requires verified firm membership")
+    return _report(db, UsageLedgerEntry.firm == current_user.verified_firm, since, until, group_by)
+
+
+@router.get("/budget", response_model=BudgetStatus)
+def budget_status(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    since = usage.period_start()
+    firm = current_user.verified_firm
+    firm_budget = usage.firm_budget(firm)
+    return BudgetStatus(
+        period_start=since,
+        user_spent_usd=usage.spent(db, since, owner_id=current_user.id),
+        user_budget_usd=settings.usage_budget_user_usd or None,
+        firm_spent_usd=usage.spent(db, since, firm=firm) if firm else None,
+        firm_budget_usd=firm_budget or None,
+    )
@@ -0,0 +1,54 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from auth import get_current_user
+from database import get_db
+from models import User, WatchlistTerm
+from schemas import WatchlistCreate, WatchlistTermOut
+from services.watchlist import visible_terms
+
+router = APIRouter(prefix="/watchlist", tags=["watchlist"])
+
+
+@router.get("/", response_model=List[WatchlistTermOut])
+def list_terms(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """The caller's own terms plus, for verified firm members, every term scoped to their firm."""
+    return db.query(WatchlistTerm).filter(visible_terms(current_user)).order_by(WatchlistTerm.term).all()
+
+
+@router.post("/", response_model=List[WatchlistTermOut], status_code=status.HTTP_201_CREATED)
+def add_terms(
+    payload: WatchlistCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if payload.scope == "firm" and not current_user.verified_firm:
+        raise HTTPException(status_code=403, detail="Firm-scoped terms require verified firm membership")
+
+    firm = current_user.verified_firm if payload.scope == "firm" else None
+    terms = list(dict.fromkeys(t.strip() for t in payload.terms if t.strip()))
+    rows = [
+        WatchlistTerm(owner_id=current_user.id, firm=firm, term=term, replacement=payload.replacement)
+        for term in terms
+    ]
+    db.add_all(rows)
+    db.commit()
+    for row in rows:
+        db.refresh(row)
+    return rows
+
+
+@router.delete("/{term_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_term(
+    term_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    term = db.query(WatchlistTerm).filter(WatchlistTerm.id == term_id, visible_terms(current_user)).first()
+    if not term:
+        raise HTTPException(status_code=404, detail="Watchlist term not found")
+    db.delete(term)
+    db.commit()
+
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from typing import Literal, Optional, List
+from pydantic import BaseModel, EmailStr, Field
 
 
 # --- Auth ---
@@ -21,6 +21,7 @@ class UserOut(BaseModel):
     email: str
     full_name: str
     firm: Optional[str]
+    firm_verified: bool = False
     created_at: datetime
 
     class Config:
@@ -39,6 +40,22 @@ class CaseCreate(BaseModel):
     brief_raw: str
     case_type: Optional[str] = None
     jurisdiction: Optional[str] = None
+    use_prior_analyses: bool = False
+
+
+class CaseUploadForm(BaseModel):
+    """Text fields of a /cases/upload form."""
+    title: str
+    case_type: Optional[str] = None
+    jurisdiction: Optional[str] = None
+    use_prior_analyses: bool = False
+
+
+class CaseUpdate(BaseModel):
+    title: Optional[str] = None
+    brief_raw: Optional[str] = None
+    case_type: Optional[str] = None
+    jurisdiction: Optional[str] = None
 
 
 class CaseOut(BaseModel):
@@ -54,9 +71,49 @@ class CaseOut(BaseModel):
         from_attributes = True
 
 
+class CaseStageOut(BaseModel):
+    stage: str
+    status: str
+    attempts: int
+    error: Optional[str]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
 class CaseDetail(CaseOut):
     brief_anonymized: Optional[str]
     report: Optional["AnalysisReportOut"]
+    stages: List[CaseStageOut] = []
+
+
+class QueueDepth(BaseModel):
+    tenant_queued: int
+    tenant_running: int
+    user_queued: int
+    user_running: int
+
+
+class CaseSearchHit(BaseModel):
+    case: CaseOut
+    # HTML: escaped case text with matches in <mark>…</mark>, safe to render as markup
+    snippet: str
+    score: float
+
+
+class CaseSearchResults(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    hits: List[CaseSearchHit]
+
+
+class SimilarCase(BaseModel):
+    case: CaseOut
+    similarity: float
+    report: Optional["AnalysisReportOut"]
 
 
 # --- Analysis ---
@@ -78,6 +135,8 @@ class ArgumentScore(BaseModel):
 class AnalysisReportOut(BaseModel):
     id: str
     case_id: str
+    version: Optional[int] = None
+    model: Optional[str] = None
     recommended_argument_style: Optional[str]
     argument_style_rationale: Optional[str]
     barrister_profiles: Optional[List[BarristerProfile]]
@@ -96,4 +155,57 @@ class AnalysisReportOut(BaseModel):
         from_attributes = True
 
 
+# --- Watchlists ---
+class WatchlistCreate(BaseModel):
+    terms: List[str] = Field(..., min_length=1, max_length=5000)
+    # Spliced into briefs sent to Claude, so only placeholder tokens are accepted
+    replacement: str = Field("[PERSON]", pattern=r"^\[[A-Z_]+\]$")
+    scope: Literal["user", "firm"] = "user"
+
+
+class WatchlistTermOut(BaseModel):
+    id: str
+    term: str
+    replacement: str
+    firm: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ReportExportRequest(BaseModel):
+    case_ids: List[str] = Field(..., min_length=1)
+
+
+# --- Usage ---
+class UsageTotals(BaseModel):
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class UsageGroup(UsageTotals):
+    key: Optional[str]
+
+
+class UsageReport(BaseModel):
+    since: datetime
+    until: datetime
+    total: UsageTotals
+    groups: List[UsageGroup]
+
+
+class BudgetStatus(BaseModel):
+    period_start: datetime
+    user_spent_usd: float
+    user_budget_usd: Optional[float]
+    firm_spent_usd: Optional[float]
+    firm_budget_usd: Optional[float]
+
+
 CaseDetail.model_rebuild()
+SimilarCase.model_rebuild()
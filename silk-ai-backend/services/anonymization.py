@@ -1,10 +1,20 @@
 """
-Two-pass anonymization: spaCy NER → Claude verification.
+Two-pass anonymization: NER → Claude verification.
+The Claude pass only sees paragraphs that a local residual-risk check flags.
 All case data must pass through this before any AI intelligence call.
 """
+import asyncio
+import hashlib
 import re
 import logging
-from typing import Tuple
+import time
+from collections import Counter
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from services import metrics, ner
+from services.ner import COMMON_CAPITALISED, HONORIFICS
 
 logger = logging.getLogger(__name__)
 
@@ -31,89 +41,405 @@ LEGAL_PATTERNS = [
     (r"\b[A-Z]{2,}\d{4,}\b", "[REFERENCE_NUMBER]"),
 ]
 
+# Paragraphs are separated by one or more blank lines. The capture group keeps
+# the separators so an anonymized brief can be reassembled with its layout intact.
+PARAGRAPH_SEPARATOR = re.compile(r"(\n[ \t]*\n\s*)")
 
-def _spacy_pass(text: str) -> Tuple[str, dict]:
-    """First pass: spaCy NER anonymization."""
-    try:
-        import spacy
-        try:
-            nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.warning("spaCy model not found — skipping NER pass")
-            return text, {}
-
-        doc = nlp(text)
-        redacted = text
-        entities_found = {}
-
-        # Process entities in reverse order to preserve offsets
-        for ent in sorted(doc.ents, key=lambda e: e.start_char, reverse=True):
-            replacement = ENTITY_REPLACEMENTS.get(ent.label_, None)
-            if replacement:
-                entities_found[ent.text] = replacement
-                redacted = redacted[: ent.start_char] + replacement + redacted[ent.end_char :]
 
-        return redacted, entities_found
-
-    except ImportError:
-        logger.warning("spaCy not installed — skipping NER pass")
-        return text, {}
+def _ner_spans(text: str, backend: Optional[str] = None) -> List[Tuple[int, int, str]]:
+    """(start, end, replacement) for entities found by the configured backend (see services.ner)."""
+    return [
+        (start, end, ENTITY_REPLACEMENTS[label])
+        for start, end, label in ner.get_backend(backend).entities(text)
+        if label in ENTITY_REPLACEMENTS
+    ]
 
 
 def _pattern_pass(text: str) -> str:
     """Apply regex patterns for legal-specific identifiers."""
+    return apply_spans(text, _select(_pattern_spans(text)))
+
+
+def _pattern_spans(text: str) -> List[Tuple[int, int, str]]:
+    spans = []
     for pattern_args in LEGAL_PATTERNS:
-        if len(pattern_args) == 3:
-            pattern, replacement, flags = pattern_args
-            text = re.sub(pattern, replacement, text, flags=flags)
-        else:
-            pattern, replacement = pattern_args
-            text = re.sub(pattern, replacement, text)
-    return text
-
-
-async def _claude_verification_pass(text: str, anthropic_client) -> str:
-    """Second pass: Claude verifies and catches any remaining PII."""
-    prompt = f"""You are a legal document anonymization assistant. Review the following text that has already been partially anonymized. 
-Your task is to identify and replace ANY remaining personally identifiable information (PII) that was missed:
+        pattern, replacement = pattern_args[:2]
+        flags = pattern_args[2] if len(pattern_args) == 3 else 0
+        spans.extend((m.start(), m.end(), replacement) for m in re.finditer(pattern, text, flags))
+    return spans
+
+
+def redaction_spans(text: str, backend: Optional[str] = None) -> List[Tuple[int, int, str]]:
+    """
+    Pass 1 (NER + legal patterns) as sorted, non-overlapping (start, end, replacement) spans.
+    Runs in the NER worker processes; the parent applies the spans.
+    """
+    return _select(_ner_spans(text, backend) + _pattern_spans(text))
+
+
+def _select(spans: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+    """Leftmost-longest, non-overlapping subset of ``spans``."""
+    selected, cursor = [], 0
+    for start, end, replacement in sorted(spans, key=lambda s: (s[0], s[0] - s[1])):
+        if start >= cursor:
+            selected.append((start, end, replacement))
+            cursor = end
+    return selected
+
+
+def apply_spans(text: str, spans: List[Tuple[int, int, str]]) -> str:
+    """Replace sorted, non-overlapping spans in one pass."""
+    parts, cursor = [], 0
+    for start, end, replacement in sorted(spans):
+        parts.append(text[cursor:start])
+        parts.append(replacement)
+        cursor = end
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def prepare_paragraphs(
+    paragraphs: List[str],
+    backend: Optional[str] = None,
+    watchlist_terms: Tuple[Tuple[str, str], ...] = (),
+    vocabulary: frozenset = frozenset(),
+) -> List[Tuple[str, float, Counter]]:
+    """
+    Everything local that happens before Claude: pass 0 (watchlist), pass 1 (NER + patterns)
+    and residual-risk scoring against the brief's ``vocabulary``, as [(text, score, signals), ...].
+    Runs in the NER worker processes; the watchlist is compiled once per worker and term set.
+    """
+    from services.watchlist import compile_watchlist
+
+    watchlist = compile_watchlist(watchlist_terms) if watchlist_terms else None
+    prepared = []
+    for paragraph in paragraphs:
+        if not paragraph.strip():
+            prepared.append((paragraph, 0.0, Counter()))
+            continue
+        if watchlist is not None:
+            paragraph = watchlist.redact(paragraph)
+        paragraph = apply_spans(paragraph, redaction_spans(paragraph, backend))
+        prepared.append((paragraph, *residual_risk(paragraph, vocabulary)))
+    return prepared
+
+
+async def offload(fn, *args):
+    """Run CPU-bound ``fn`` in the NER process pool, or a thread when ner_workers is 0, never on the event loop."""
+    from services.executors import get_pool, run_in_pool
+
+    if settings.ner_workers > 0:
+        pool = get_pool("ner", settings.ner_workers, initializer=partial(ner.preload, settings.ner_backend))
+        return await run_in_pool(pool, fn, *args)
+    return await asyncio.to_thread(fn, *args)
+
+
+# Residual-risk signals left after pass 1, with their score weights
+RESIDUAL_PATTERNS = [
+    ("email", re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), 3.0),
+    ("phone", re.compile(r"(?<![\w\]])(?:\+\d{1,3}[ .-]?)?\(?\d{2,5}\)?(?:[ .-]?\d{2,4}){2,3}(?!\w)"), 3.0),
+    ("postcode", re.compile(r"\b[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b"), 2.0),
+    ("account_number", re.compile(
+        r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){3,7}\b"  # IBAN
+        r"|\b\d{2}-\d{2}-\d{2}\b"  # sort code
+        r"|\b(?:\d{4}[ -]){3}\d{4}\b"  # card
+        r"|\b\d{8,}\b"
+    ), 2.0),
+]
+# Digit-count floor, so years, amounts and sort codes don't read as phone numbers
+_MIN_DIGITS = {"phone": 9}
+TITLED_NAME_WEIGHT = 2.0
+NAME_SEQUENCE_WEIGHT = 1.5
+# Meets the default threshold of 1.0 on its own: a lone surname is the most common thing
+# pass 1 misses. Only counted with evidence that the word is a name (see residual_risk)
+CAPITALISED_WORD_WEIGHT = 1.0
+
+_PLACEHOLDER = re.compile(r"\[[A-Z_]+\]")
+_CAPITALISED_RUN = re.compile(r"\b[A-Z][a-z'’-]+(?:[ \t]+[A-Z][a-z'’-]+)*")
+# All-caps words with a vowel (names in headings or emphasis, not acronyms like NHS or UK)
+_UPPERCASE_WORD = re.compile(r"\b(?=[A-Z'’-]*[AEIOUY])[A-Z][A-Z'’-]{2,}\b")
+_LOWERCASE_WORD = re.compile(r"\b[a-z][a-z'’-]+\b")
+_SENTENCE_START = set(".!?:;\"'(“‘\n")
+# Words that open sentences in briefs; capitalised there only by position
+SENTENCE_OPENERS = {
+    "Accordingly", "Additionally", "After", "Again", "Against", "All", "Also", "Alternatively",
+    "Although", "Another", "Any", "Are", "As", "Because", "Before", "Between", "Both", "But", "Can", "Consequently",
+    "Could", "Did", "Do", "Does", "During", "Each", "Either", "Finally", "First", "Firstly", "Following", "From",
+    "Further", "Furthermore", "Given", "Had", "Has", "Having", "Hence", "Her", "Here", "His", "However", "Indeed",
+    "Instead", "Is", "Its", "Likewise", "Many", "Meanwhile", "Moreover", "Most", "Must", "My", "Neither",
+    "Nevertheless", "No", "Nonetheless", "Nor", "Not", "Notwithstanding", "Once", "One", "Only", "Other",
+    "Otherwise", "Our", "Per", "Prior", "Pursuant", "Save", "Second", "Secondly", "Shall", "Should", "Similarly",
+    "Since", "So", "Some", "Subject", "Such", "Then", "There", "Therefore", "Third", "Thirdly", "Thus", "To",
+    "Under", "Unless", "Until", "Upon", "Was", "Were", "What", "When", "Where", "Whereas", "Which", "While",
+    "Who", "With", "Within", "Without", "Would", "Yet", "You", "Your",
+}
+
+
+def lowercase_vocabulary(text: str) -> frozenset:
+    """Words that appear in lower case somewhere in ``text``, i.e. are ordinary words in this brief."""
+    return frozenset(_LOWERCASE_WORD.findall(text))
+
+
+def residual_risk(text: str, vocabulary: frozenset = frozenset()) -> Tuple[float, Counter]:
+    """
+    Score how likely ``text`` still contains PII after pass 1.
+    Returns (score, {signal: count}); placeholders never count.
+
+    A capitalised word mid-sentence is evidence of a name. A word capitalised only by its
+    position (opening a sentence) or written in capitals counts only if it is not a common
+    opener and never appears in lower case in ``vocabulary`` (see lowercase_vocabulary),
+    so "However, ..." or "DAMAGES" in a brief that mentions damages score nothing.
+    """
+    signals: Counter = Counter()
+    scan = _PLACEHOLDER.sub(" ", text)
+    score = 0.0
+    for name, pattern, weight in RESIDUAL_PATTERNS:
+        min_digits = _MIN_DIGITS.get(name, 0)
+        hits = sum(1 for m in pattern.finditer(scan) if sum(c.isdigit() for c in m.group()) >= min_digits)
+        if hits:
+            signals[name] += hits
+            score += weight * hits
+
+    # JOHN SMITH scores as John Smith (capitalize() keeps offsets, so the original case stays readable)
+    original = scan
+    scan = _UPPERCASE_WORD.sub(lambda m: m.group().capitalize(), scan)
+    for match in _CAPITALISED_RUN.finditer(scan):
+        words = match.group().split()
+        preceding = scan[: match.start()].rstrip(" \t")
+        sentence_initial = not preceding or preceding[-1] in _SENTENCE_START
+        uppercase = [w.isupper() for w in original[match.start() : match.end()].split()]
+        if any(w in HONORIFICS for w in words[:-1]) and words[-1] not in COMMON_CAPITALISED:
+            signals["titled_name"] += 1
+            score += TITLED_NAME_WEIGHT
+            continue
+        names = [
+            w for i, w in enumerate(words)
+            if w not in COMMON_CAPITALISED
+            and not ((i == 0 and sentence_initial or uppercase[i]) and _ordinary_word(w, vocabulary))
+        ]
+        if len(names) >= 2:
+            signals["name_sequence"] += 1
+            score += NAME_SEQUENCE_WEIGHT
+        elif names:
+            signals["capitalised_word"] += 1
+            score += CAPITALISED_WORD_WEIGHT
+    return score, signals
+
+
+def _ordinary_word(word: str, vocabulary: frozenset) -> bool:
+    return word in SENTENCE_OPENERS or word.lower() in vocabulary
+
+
+# Paragraphs per Claude verification call are capped by size, so a long brief costs a
+# handful of calls rather than one per paragraph
+VERIFY_BATCH_CHARS = 40_000
+# Paragraphs per worker-process job: large enough to amortise the IPC, small enough to spread
+PREPARE_BATCH_CHARS = 20_000
+
+
+async def _claude_verification_pass(paragraphs: List[str], anthropic_client) -> List[str]:
+    """
+    Second pass: Claude finds PII left in a batch of paragraphs. It returns only what to
+    replace, not the text, so output (and latency) stays small however long the batch is.
+    Raises if the reply can't be parsed; the caller treats the batch as unverified.
+    """
+    numbered = "\n\n".join(f"[{n}]\n{p}" for n, p in enumerate(paragraphs, 1))
+    prompt = f"""You are a legal document anonymization assistant. The numbered paragraphs below have already been partially anonymized; placeholders such as [PERSON] are safe.
+Your task is to identify ANY remaining personally identifiable information (PII) that was missed:
 - Real names of individuals (replace with [PERSON])
-- Company or organisation names (replace with [ORGANISATION])  
+- Company or organisation names (replace with [ORGANISATION])
 - Specific addresses or locations (replace with [LOCATION])
 - Phone numbers, email addresses (replace with [CONTACT])
 - Account numbers, case file numbers (replace with [REFERENCE])
 - Any other information that could identify a specific real person or entity
 
-Return ONLY the anonymized text. Do not add any commentary or explanation.
+Return ONLY a JSON array with one object per item found, copying the text exactly as it appears:
+[{{"paragraph": 1, "text": "John Smith", "replacement": "[PERSON]"}}]
+Return [] if nothing remains. Do not add any commentary or explanation.
 
-TEXT TO ANONYMIZE:
-{text}"""
+PARAGRAPHS:
+{numbered}"""
 
+    from services import usage
+    from services.claude_service import CLAUDE_MODEL, parse_json_reply, rate_limiter
+
+    await rate_limiter.acquire()
+    started = time.monotonic()
     message = await anthropic_client.messages.create(
-        model="claude-opus-4-5",
+        model=CLAUDE_MODEL,
         max_tokens=4096,
         messages=[{"role": "user", "content": prompt}],
     )
-    return message.content[0].text
+    await asyncio.to_thread(usage.record, message, CLAUDE_MODEL, "anonymization", started)
+    if getattr(message, "stop_reason", None) == "max_tokens":
+        raise ValueError("Verification reply was truncated")
+
+    redacted = list(paragraphs)
+    for item in parse_json_reply(message.content[0].text):
+        n, found = int(item["paragraph"]), str(item["text"])
+        if not 1 <= n <= len(paragraphs) or not found.strip():
+            continue
+        # Only placeholders are ever written into a brief
+        replacement = item.get("replacement")
+        if not isinstance(replacement, str) or not _PLACEHOLDER.fullmatch(replacement):
+            replacement = "[REDACTED]"
+        redacted[n - 1] = redacted[n - 1].replace(found, replacement)
+    return redacted
 
 
-async def anonymize(text: str, anthropic_client=None) -> str:
+async def anonymize(text: str, anthropic_client=None, watchlist=None) -> Tuple[str, bool]:
     """
     Full two-pass anonymization pipeline.
-    Pass 1: spaCy NER + regex patterns
+    Pass 0: firm/user watchlist terms (if a compiled watchlist is provided)
+    Pass 1: NER + regex patterns
+    Both, and the residual-risk scoring, run in the NER process pool (see prepare_paragraphs).
     Pass 2: Claude Opus verification (if client provided)
+    Returns (text, verified); ``verified`` is False if a Claude verification call failed,
+    in which case the text is only as good as pass 1 and must not be cached.
     """
-    # Pass 1: spaCy NER
-    text, _ = _spacy_pass(text)
+    chunks = split_paragraphs(text)
+    vocabulary = await offload(lowercase_vocabulary, text)
+    results = await anonymize_paragraphs(chunks[::2], anthropic_client, watchlist, vocabulary)
+    chunks[::2] = [paragraph for paragraph, _ in results]
+    return "".join(chunks), all(verified for _, verified in results)
+
+
+async def anonymize_paragraphs(
+    paragraphs: List[str], anthropic_client=None, watchlist=None, vocabulary: frozenset = frozenset()
+) -> List[Tuple[str, bool]]:
+    """
+    anonymize() for separate paragraphs, with the risky ones verified together in batches.
+    ``vocabulary`` is the whole brief's lowercase_vocabulary(), for residual_risk().
+    """
+    terms = watchlist.terms if watchlist is not None else ()
+    # Passes 0 and 1 and the risk scores, spread across the worker processes
+    results = await asyncio.gather(*(
+        offload(prepare_paragraphs, batch, settings.ner_backend, terms, vocabulary)
+        for batch in _batched(paragraphs, PREPARE_BATCH_CHARS)
+    ))
+    prepared = [item for batch in results for item in batch]
+
+    # Pass 2: Claude verification, only for paragraphs with residual risk
+    if not anthropic_client:
+        return [(text, True) for text, _, _ in prepared]
+    return await _verify_paragraphs(prepared, anthropic_client)
+
+
+async def _verify_paragraphs(
+    prepared: List[Tuple[str, float, Counter]], anthropic_client
+) -> List[Tuple[str, bool]]:
+    paragraphs = [text for text, _, _ in prepared]
+    risky = []
+    for i, (paragraph, score, signals) in enumerate(prepared):
+        if not paragraph.strip():
+            continue
+        verify = score >= settings.pii_verification_threshold
+        decision = "verified" if verify else "skipped"
+        metrics.inc("silk_anonymization_verification_total", decision=decision)
+        # Audit trail: no paragraph content, only its hash and the signals behind the decision
+        logger.info(
+            f"PII verification {decision}: paragraph={paragraph_hash(paragraph)[:16]} "
+            f"score={score:.1f} threshold={settings.pii_verification_threshold} signals={dict(signals)}"
+        )
+        if verify:
+            risky.append(i)
+
+    batches = _batched(risky, VERIFY_BATCH_CHARS, size=lambda i: len(paragraphs[i]))
+    # What the prefilter saves: calls made against the calls verifying every paragraph would take
+    unfiltered = _batched([p for p in paragraphs if p.strip()], VERIFY_BATCH_CHARS)
+    metrics.inc("silk_anonymization_verification_calls_total", len(batches), kind="made")
+    metrics.inc("silk_anonymization_verification_calls_total", len(unfiltered), kind="unfiltered")
+    results = [(p, True) for p in paragraphs]
+    semaphore = asyncio.Semaphore(max(1, settings.anonymization_concurrency))
+
+    async def _run(batch: List[int]):
+        async with semaphore:
+            try:
+                verified = await _claude_verification_pass([paragraphs[i] for i in batch], anthropic_client)
+            except Exception as e:
+                logger.error(f"Claude anonymization pass failed for {len(batch)} paragraph(s): {e}")
+                # Continue with the pass-1 result — do not block the pipeline
+                for i in batch:
+                    results[i] = (paragraphs[i], False)
+                return
+            for i, paragraph in zip(batch, verified):
+                results[i] = (paragraph, True)
 
-    # Pass 1b: regex patterns
-    text = _pattern_pass(text)
+    await asyncio.gather(*(_run(batch) for batch in batches))
+    return results
+
+
+def _batched(items: list, limit: int, size=len) -> List[list]:
+    """Consecutive batches of ``items`` whose sizes add up to at most ``limit`` (an oversized item goes alone)."""
+    batches, total = [], 0
+    for item in items:
+        if not batches or total + size(item) > limit:
+            batches.append([])
+            total = 0
+        batches[-1].append(item)
+        total += size(item)
+    return batches
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text into alternating paragraph / separator chunks (even indices are paragraphs)."""
+    return PARAGRAPH_SEPARATOR.split(text)
+
+
+def paragraph_hash(paragraph: str, salt: str = "") -> str:
+    """
+    Content hash used as the anonymization cache key for a paragraph.
+    ``salt`` is the watchlist fingerprint, so editing a watchlist invalidates cached paragraphs.
+    """
+    return hashlib.sha256(f"{salt}\0{paragraph}".encode("utf-8") if salt else paragraph.encode("utf-8")).hexdigest()
+
+
+def paragraph_hashes(text: str, salt: str = "") -> List[str]:
+    """Hashes of every non-blank paragraph in text, in document order."""
+    chunks = split_paragraphs(text)
+    return [paragraph_hash(p, salt) for p in chunks[::2] if p.strip()]
+
+
+async def anonymize_incremental(
+    text: str,
+    anthropic_client=None,
+    cache: Dict[str, str] = None,
+    watchlist=None,
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Paragraph-level anonymization backed by a content-hash cache.
+    Paragraphs whose hash is already in ``cache`` are reused as-is; only new or
+    edited paragraphs go through the full pipeline.
+    Returns the reassembled anonymized text and the newly computed cache entries.
+    Paragraphs whose Claude verification failed are used for this run but left out of
+    the entries, so the next run verifies them again.
+    """
+    cache = cache or {}
+    salt = watchlist.fingerprint if watchlist is not None else ""
+    chunks = split_paragraphs(text)
+
+    misses = {}
+    for paragraph in chunks[::2]:
+        if paragraph.strip():
+            key = paragraph_hash(paragraph, salt)
+            if key not in cache:
+                misses[key] = paragraph
+
+    # Scored against the whole brief, cached paragraphs included
+    vocabulary = await offload(lowercase_vocabulary, text) if misses else frozenset()
+    results = dict(zip(
+        misses, await anonymize_paragraphs(list(misses.values()), anthropic_client, watchlist, vocabulary)
+    ))
+    new_entries = {key: text for key, (text, verified) in results.items() if verified}
+    logger.info(
+        f"Incremental anonymization: {len(results)} paragraph(s) anonymized "
+        f"({len(results) - len(new_entries)} unverified, not cached), "
+        f"{sum(1 for p in chunks[::2] if p.strip()) - len(results)} reused from cache"
+    )
 
-    # Pass 2: Claude verification
-    if anthropic_client:
-        try:
-            text = await _claude_verification_pass(text, anthropic_client)
-        except Exception as e:
-            logger.error(f"Claude anonymization pass failed: {e}")
-            # Continue with spaCy result — do not block the pipeline
+    resolved = {**cache, **{key: text for key, (text, _) in results.items()}}
+    for i in range(0, len(chunks), 2):
+        if chunks[i].strip():
+            chunks[i] = resolved[paragraph_hash(chunks[i], salt)]
 
-    return text
+    return "".join(chunks), new_entries
@@ -3,8 +3,10 @@ Claude Opus intelligence service.
 All intelligence endpoints use claude-opus-4-5 — non-negotiable premium tier.
 All text passed here must already be anonymized.
 """
+import asyncio
 import json
 import logging
+import time
 from typing import Optional
 
 import anthropic
@@ -15,6 +17,44 @@ logger = logging.getLogger(__name__)
 
 CLAUDE_MODEL = "claude-opus-4-5"
 
+# Bump whenever SYSTEM_PROMPT or the analyse_case output schema changes; stored on each
+# report so the backfill CLI can find reports produced by an older prompt.
+PROMPT_VERSION = "1"
+
+
+class RateLimiter:
+    """Per-process token bucket for outbound Claude requests."""
+
+    def __init__(self, requests_per_minute: float):
+        self.set_rate(requests_per_minute)
+
+    def set_rate(self, requests_per_minute: float):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, requests_per_minute / 60.0 * 5)  # allow ~5s of burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+rate_limiter = RateLimiter(settings.claude_requests_per_minute)
+
 
 def get_client() -> anthropic.AsyncAnthropic:
     return anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
@@ -30,14 +70,27 @@ You provide authoritative, sophisticated legal intelligence. Your analysis is:
 All case briefs you receive have been anonymized. Treat [PERSON], [ORGANISATION], [JURISDICTION] etc. as anonymized placeholders."""
 
 
-async def analyse_case(anonymized_brief: str, case_type: Optional[str], jurisdiction: Optional[str]) -> dict:
+async def analyse_case(
+    anonymized_brief: str,
+    case_type: Optional[str],
+    jurisdiction: Optional[str],
+    prior_context: Optional[str] = None,
+) -> dict:
     """
     Full case analysis: argument style, barrister profiles, judge prediction,
     argument scoring, and strategy report.
+    prior_context optionally summarises earlier analyses of similar matters.
     Returns structured JSON.
     """
     client = get_client()
 
+    prior_section = ""
+    if prior_context:
+        prior_section = f"""
+PRIOR ANALYSES OF SIMILAR MATTERS (reference only — the brief above takes precedence):
+{prior_context}
+"""
+
     prompt = f"""Analyse the following anonymized case brief and produce a complete strategic intelligence report.
 
 CASE TYPE: {case_type or "Not specified"}
@@ -45,7 +98,7 @@ JURISDICTION: {jurisdiction or "Not specified"}
 
 ANONYMIZED BRIEF:
 {anonymized_brief}
-
+{prior_section}
 Return a JSON object with EXACTLY this structure:
 {{
   "argument_style": {{
@@ -85,14 +138,24 @@ Return a JSON object with EXACTLY this structure:
 Provide 2-3 barrister profiles, 3-5 argument scores, 3-4 opposition arguments, 3-5 risk areas, and 4-6 preparation steps.
 Return ONLY valid JSON. No markdown, no commentary."""
 
+    from services import usage
+
+    await rate_limiter.acquire()
+    started = time.monotonic()
     message = await client.messages.create(
         model=CLAUDE_MODEL,
         max_tokens=8192,
         system=SYSTEM_PROMPT,
         messages=[{"role": "user", "content": prompt}],
     )
+    await asyncio.to_thread(usage.record, message, CLAUDE_MODEL, "analysis", started)
+
+    return parse_json_reply(message.content[0].text)
+
 
-    raw = message.content[0].text.strip()
+def parse_json_reply(raw: str):
+    """Parse a JSON reply, tolerating markdown code fences around it."""
+    raw = raw.strip()
 
     # Strip markdown code fences if present
     if raw.startswith("```"):
@@ -0,0 +1,39 @@
+"""
+Bounded process pools for CPU-bound work that must not run on the event loop.
+Pools are created lazily by name and shared for the life of the process.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+# Workers never fork from the API process: a fork would copy its event loop, threads and
+# DB connections mid-use, along with any locks they hold
+_mp_context = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def get_pool(name: str, max_workers: int, initializer: Optional[Callable] = None) -> ProcessPoolExecutor:
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=_mp_context, initializer=initializer
+            )
+        return pool
+
+
+async def run_in_pool(pool: ProcessPoolExecutor, fn: Callable, *args):
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+def shutdown_pools():
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
@@ -0,0 +1,58 @@
+"""
+Text extraction for uploaded case documents (PDF, DOCX, plain text).
+Runs inside a worker process: everything here is CPU-bound and must never
+execute on the event loop.
+"""
+import os
+import zipfile
+from xml.etree import ElementTree
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt", ".md"}
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class UnsupportedDocument(ValueError):
+    pass
+
+
+def extract_text(path: str, filename: str) -> str:
+    """Extract plain text from the document at ``path``; ``filename`` selects the format."""
+    ext = os.path.splitext(filename.lower())[1]
+    if ext == ".pdf":
+        return _extract_pdf(path)
+    if ext == ".docx":
+        return _extract_docx(path)
+    if ext in (".txt", ".md"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    raise UnsupportedDocument(f"Unsupported document type: {ext or 'unknown'}")
+
+
+def _extract_pdf(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("PDF extraction requires pypdf to be installed")
+
+    reader = PdfReader(path)
+    return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages)
+
+
+def _extract_docx(path: str) -> str:
+    """Paragraph text from word/document.xml, streamed so large documents aren't parsed into one tree."""
+    paragraphs = []
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        parts = []
+        for event, elem in ElementTree.iterparse(xml, events=("end",)):
+            if elem.tag == f"{_W_NS}t":
+                parts.append(elem.text or "")
+            elif elem.tag == f"{_W_NS}tab":
+                parts.append("\t")
+            elif elem.tag in (f"{_W_NS}br", f"{_W_NS}cr"):
+                parts.append("\n")
+            elif elem.tag == f"{_W_NS}p":
+                paragraphs.append("".join(parts))
+                parts = []
+                elem.clear()
+    return "\n\n".join(p for p in paragraphs if p.strip())
@@ -0,0 +1,51 @@
+"""
+Minimal in-process metrics registry, rendered in Prometheus text format at /metrics.
+Counters are cumulative per process; gauges are sampled from callbacks at scrape time.
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Tuple
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[_LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+_gauges: Dict[str, Callable[[], Dict[_LabelKey, float]]] = {}
+
+
+def labels(**kwargs) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+
+
+def inc(name: str, value: float = 1.0, **label_values) -> None:
+    with _lock:
+        _counters[name][labels(**label_values)] += value
+
+
+def counter_value(name: str, **label_values) -> float:
+    with _lock:
+        return _counters.get(name, {}).get(labels(**label_values), 0.0)
+
+
+def register_gauge(name: str, sample: Callable[[], Dict[_LabelKey, float]]) -> None:
+    """``sample`` returns {labels(...): value} and is called on every scrape."""
+    _gauges[name] = sample
+
+
+def _format(name: str, key: _LabelKey, value: float) -> str:
+    if not key:
+        return f"{name} {value}"
+    rendered = ",".join(f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in key)
+    return f"{name}{{{rendered}}} {value}"
+
+
+def render() -> str:
+    lines = []
+    with _lock:
+        for name, series in sorted(_counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(_format(name, key, value) for key, value in sorted(series.items()))
+    for name, sample in sorted(_gauges.items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(_format(name, key, value) for key, value in sorted(sample().items()))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,211 @@
+"""
+Named-entity backends for the first anonymization pass.
+
+    spacy_sm   en_core_web_sm with only the components NER needs
+    spacy_trf  en_core_web_trf (transformer), same trimming; slower, more accurate
+    regex      heuristics only — no model, used when a spaCy model is unavailable
+
+Select one per deployment with the ``ner_backend`` setting. ``benchmark()`` (and
+``cli.py bench-ner``) measures throughput and recall on labelled briefs so the
+trade-off can be chosen from numbers.
+"""
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+Span = Tuple[int, int, str]  # (start_char, end_char, spaCy-style label)
+
+# NER reads only token vectors; parser, tagger, lemmatizer and friends are never loaded
+SPACY_EXCLUDE = ["parser", "tagger", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+HONORIFICS = {"Mr", "Mrs", "Ms", "Miss", "Dr", "Prof", "Sir", "Dame", "Lord", "Lady", "Judge", "Justice"}
+# Capitalised words that are common in briefs and carry no identity
+COMMON_CAPITALISED = HONORIFICS | {
+    "The", "This", "That", "These", "Those", "In", "On", "At", "By", "For", "Of", "And", "Or", "If", "It", "He",
+    "She", "They", "We", "I", "A", "An", "Court", "Courts", "Appeal", "High", "Supreme", "Crown", "County",
+    "Magistrates", "Tribunal", "Act", "Section", "Article", "Schedule", "Part", "Clause", "Rule", "Rules",
+    "Regulation", "Regulations", "Order", "Plaintiff", "Defendant", "Claimant", "Respondent", "Appellant",
+    "Applicant", "Counsel", "Honour", "Parliament", "State", "Government", "Contract", "Agreement", "Law",
+    "January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+    "November", "December", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday",
+}
+
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+
+class SpacyBackend:
+    def __init__(self, name: str, model: str):
+        self.name = name
+        try:
+            import spacy
+        except ImportError as e:
+            raise BackendUnavailable("spaCy not installed") from e
+        try:
+            self._nlp = spacy.load(model, exclude=SPACY_EXCLUDE)
+        except OSError as e:
+            raise BackendUnavailable(f"spaCy model {model} not installed") from e
+        self._nlp.max_length = max(self._nlp.max_length, 5_000_000)
+
+    def entities(self, text: str) -> List[Span]:
+        return [(e.start_char, e.end_char, e.label_) for e in self._nlp(text).ents]
+
+    def entities_many(self, texts: List[str]) -> List[List[Span]]:
+        return [[(e.start_char, e.end_char, e.label_) for e in doc.ents] for doc in self._nlp.pipe(texts)]
+
+
+_WORD = r"[A-Z][a-z'’-]+"
+_ORG_SUFFIX = r"(?:Ltd|Limited|LLP|LLC|Inc|plc|PLC|Corp|Corporation|Company|Bank|Group|Holdings|Council|Trust|Partners)"
+_MONTH = (
+    r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|"
+    r"Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
+)
+
+
+class RegexBackend:
+    """Organisations by legal suffix, titled and multi-word capitalised names, and dates."""
+
+    name = "regex"
+    _RULES = [
+        ("ORG", re.compile(rf"\b(?:{_WORD}[ \t]+)*{_WORD}[ \t]+{_ORG_SUFFIX}\b")),
+        ("DATE", re.compile(
+            rf"\b\d{{1,2}}(?:st|nd|rd|th)?[ \t]+{_MONTH}\.?,?[ \t]+\d{{4}}\b"
+            rf"|\b{_MONTH}\.?[ \t]+\d{{1,2}}(?:st|nd|rd|th)?,?[ \t]+\d{{4}}\b"
+            r"|\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b|\b\d{4}-\d{2}-\d{2}\b"
+        )),
+        ("PERSON", re.compile(rf"\b(?:{'|'.join(sorted(HONORIFICS))})\.?[ \t]+{_WORD}(?:[ \t]+{_WORD})*")),
+        ("PERSON", re.compile(rf"\b{_WORD}(?:[ \t]+{_WORD})+")),
+    ]
+
+    def entities(self, text: str) -> List[Span]:
+        spans: List[Span] = []
+        taken = bytearray(len(text))
+        for label, pattern in self._RULES:
+            for m in pattern.finditer(text):
+                start, end = m.span()
+                if label == "PERSON" and m.group().split()[0] not in HONORIFICS:
+                    # Bare capitalised runs count only if every word is a plausible name
+                    if any(w in COMMON_CAPITALISED for w in m.group().split()):
+                        continue
+                if any(taken[start:end]):
+                    continue
+                taken[start:end] = b"\x01" * (end - start)
+                spans.append((start, end, label))
+        return sorted(spans)
+
+    def entities_many(self, texts: List[str]) -> List[List[Span]]:
+        return [self.entities(t) for t in texts]
+
+
+BACKENDS = {
+    "spacy_sm": lambda: SpacyBackend("spacy_sm", "en_core_web_sm"),
+    "spacy_trf": lambda: SpacyBackend("spacy_trf", "en_core_web_trf"),
+    "regex": RegexBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def load_backend(name: str):
+    """Load (once per process) the named backend. Raises BackendUnavailable."""
+    if name not in BACKENDS:
+        raise BackendUnavailable(f"Unknown NER backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+@lru_cache(maxsize=None)
+def get_backend(name: str = None):
+    """The configured backend, falling back to regex if its model cannot be loaded."""
+    name = name or settings.ner_backend
+    try:
+        return load_backend(name)
+    except BackendUnavailable as e:
+        logger.warning(f"{e} — falling back to regex NER backend")
+        return load_backend("regex")
+
+
+def preload(name: str) -> None:
+    """Process-pool initializer: load the backend before the worker takes its first job."""
+    get_backend(name)
+
+
+# --- benchmark ---
+@dataclass
+class BenchmarkResult:
+    backend: str
+    chars: int
+    seconds: float
+    recall: float
+    precision: float
+    recall_by_label: Dict[str, float]
+
+    @property
+    def chars_per_second(self) -> float:
+        return self.chars / self.seconds if self.seconds else float("inf")
+
+
+def load_fixtures(path: str) -> List[Tuple[str, List[Span]]]:
+    """
+    JSONL of {"text": ..., "entities": [[surface, label], ...]}. Every occurrence of
+    each surface string is a gold span, so fixtures stay readable without offsets.
+    """
+    samples = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            text, gold = item["text"], []
+            for surface, label in item["entities"]:
+                gold.extend((m.start(), m.end(), label) for m in re.finditer(re.escape(surface), text))
+            samples.append((text, sorted(gold)))
+    return samples
+
+
+def _covered(span: Span, predicted: Iterable[Span]) -> bool:
+    """A gold span counts as redacted only if predicted spans cover every character of it."""
+    start, end, _ = span
+    mask = [False] * (end - start)
+    for p_start, p_end, _ in predicted:
+        for i in range(max(start, p_start), min(end, p_end)):
+            mask[i - start] = True
+    return all(mask)
+
+
+def benchmark(backend, samples: List[Tuple[str, List[Span]]], repeat: int = 3) -> BenchmarkResult:
+    """Best-of-``repeat`` throughput plus span-coverage recall and precision over ``samples``."""
+    texts = [text for text, _ in samples]
+    backend.entities_many(texts[:1])  # warm-up: lazy weights, regex compilation
+
+    best, predicted = float("inf"), []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        predicted = backend.entities_many(texts)
+        best = min(best, time.perf_counter() - started)
+
+    found, total, hits, n_predicted = {}, {}, 0, 0
+    for (text, gold), spans in zip(samples, predicted):
+        for span in gold:
+            total[span[2]] = total.get(span[2], 0) + 1
+            if _covered(span, spans):
+                found[span[2]] = found.get(span[2], 0) + 1
+        n_predicted += len(spans)
+        hits += sum(1 for p in spans if any(p[0] < g[1] and g[0] < p[1] for g in gold))
+
+    gold_count = sum(total.values())
+    return BenchmarkResult(
+        backend=backend.name,
+        chars=sum(len(t) for t in texts),
+        seconds=best,
+        recall=sum(found.values()) / gold_count if gold_count else 1.0,
+        precision=hits / n_predicted if n_predicted else 1.0,
+        recall_by_label={label: found.get(label, 0) / n for label, n in sorted(total.items())},
+    )
@@ -1,13 +1,22 @@
 """
 PDF export service for Case Strategy Reports.
 """
+import glob
+import hashlib
 import io
 import logging
+import os
+import tempfile
 from datetime import datetime
 from typing import Optional
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
+# Bump when the report layout changes so cached PDFs are re-rendered
+PDF_TEMPLATE_VERSION = 1
+
 
 def generate_strategy_report_pdf(case_title: str, report_data: dict, case_type: Optional[str] = None) -> bytes:
     """Generate a formatted PDF strategy report. Returns PDF bytes."""
@@ -188,3 +197,45 @@ def generate_strategy_report_pdf(case_title: str, report_data: dict, case_type:
     except ImportError:
         logger.error("ReportLab not installed — cannot generate PDF")
         raise RuntimeError("PDF generation requires reportlab to be installed")
+
+
+def _cache_path(cache_dir: str, report_id: str, case_title: str, case_type: Optional[str]) -> str:
+    # The case title and type are printed on the PDF but can be edited without a new report
+    heading = hashlib.sha256(f"{case_title}\0{case_type or ''}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{report_id}-{heading}-v{PDF_TEMPLATE_VERSION}.pdf")
+
+
+def render_cached_pdf(
+    report_id: str,
+    case_title: str,
+    report_data: dict,
+    case_type: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> str:
+    """
+    Return the path of the rendered PDF for a report, rendering it on a cache miss.
+    Reports are immutable once written; the cache key is the report id plus the
+    case heading it is printed under. Safe to call from worker processes; pass the
+    parent's ``cache_dir`` there, since workers load their own settings.
+    """
+    cache_dir = cache_dir or settings.pdf_cache_dir
+    path = _cache_path(cache_dir, report_id, case_title, case_type)
+    if os.path.exists(path):
+        return path
+
+    pdf_bytes = generate_strategy_report_pdf(case_title, report_data, case_type)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+    return path
+
+
+def evict_cached_pdf(report_id: str) -> None:
+    """Remove every cached rendering of a report, under any heading or template version."""
+    for path in glob.glob(os.path.join(glob.escape(settings.pdf_cache_dir), f"{report_id}-*.pdf")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,59 @@
+"""
+Persistence of analysis results as versioned AnalysisReport rows.
+Shared by the request pipeline and the re-analysis backfill CLI.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import AnalysisReport, Case
+from services import search
+from services.claude_service import CLAUDE_MODEL, PROMPT_VERSION
+from services.pdf_service import evict_cached_pdf
+
+
+def save_report(db: Session, case: Case, result: dict) -> AnalysisReport:
+    """Store ``result`` as the case's new current report, keeping earlier versions."""
+    arg_style = result.get("argument_style", {})
+    judge_pred = result.get("judge_prediction", {})
+    strat = result.get("strategy_report", {})
+
+    previous = case.report
+    if previous is not None:
+        evict_cached_pdf(previous.id)
+        previous.is_current = False
+        # Flush before inserting so the one-current-report index never sees two
+        db.flush()
+    latest_version = db.query(func.max(AnalysisReport.version)).filter(AnalysisReport.case_id == case.id).scalar()
+
+    report = AnalysisReport(
+        case_id=case.id,
+        version=(latest_version or 0) + 1,
+        is_current=True,
+        model=CLAUDE_MODEL,
+        prompt_version=PROMPT_VERSION,
+        recommended_argument_style=arg_style.get("recommended_style"),
+        argument_style_rationale=arg_style.get("rationale"),
+        barrister_profiles=result.get("barrister_profiles", []),
+        ruling_prediction=judge_pred.get("prediction"),
+        ruling_confidence=judge_pred.get("confidence"),
+        precedent_cases=judge_pred.get("precedent_cases", []),
+        argument_scores=result.get("argument_scores", []),
+        overall_strength=_calc_overall_strength(result.get("argument_scores", [])),
+        recommended_approach=strat.get("recommended_approach"),
+        opposition_arguments=strat.get("opposition_arguments", []),
+        risk_areas=strat.get("risk_areas", []),
+        preparation_steps=strat.get("preparation_steps", []),
+    )
+    db.add(report)
+    case.status = "complete"
+    db.flush()
+    db.refresh(case)
+    search.index_case(db, case)
+    return report
+
+
+def _calc_overall_strength(argument_scores: list) -> float:
+    if not argument_scores:
+        return 0.0
+    scores = [float(a.get("score", 0)) for a in argument_scores]
+    return round(sum(scores) / len(scores), 2)
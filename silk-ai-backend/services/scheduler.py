@@ -0,0 +1,209 @@
+"""
+Per-tenant fair-share scheduling of case-processing jobs.
+
+A tenant is a verified firm (User.verified_firm), or the individual user otherwise;
+a self-declared firm name must never buy a share of that firm's slots or weight.
+Slots are granted by weighted fair queuing across tenants and round-robin
+across users within a tenant, subject to global, per-tenant and per-user
+concurrency caps. A bulk import from one firm therefore queues behind its own
+quota instead of delaying everyone else.
+
+The scheduler is per-process; each API worker schedules the jobs it accepted.
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from config import settings
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    key: str
+    user_id: str
+    tenant: str
+    factory: Callable[[], Awaitable]
+    grant: Optional[asyncio.Future] = None
+
+
+@dataclass
+class _Tenant:
+    weight: float
+    finish_tag: float = 0.0
+    running: int = 0
+    queues: "OrderedDict[str, Deque[_Job]]" = field(default_factory=OrderedDict)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+
+def tenant_key(user_id: str, firm: Optional[str]) -> str:
+    firm = (firm or "").strip().lower()
+    return f"firm:{firm}" if firm else f"user:{user_id}"
+
+
+class FairScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_per_tenant: int,
+        max_per_user: int,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_tenant = max_per_tenant
+        self.max_per_user = max_per_user
+        self.weights = {tenant_key("", k): v for k, v in (weights or {}).items()}
+        self._tenants: Dict[str, _Tenant] = {}
+        self._user_running: Dict[str, int] = {}
+        self._running = 0
+        self._virtual_time = 0.0
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, key: str, user_id: str, firm: Optional[str], factory: Callable[[], Awaitable]) -> asyncio.Task:
+        """Queue a job; ``factory`` is called once a slot is granted. Must be called on the event loop."""
+        job = _Job(key=key, user_id=user_id, tenant=tenant_key(user_id, firm), factory=factory)
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks[key] = task
+        task.add_done_callback(lambda t: self._tasks.pop(key, None) if self._tasks.get(key) is t else None)
+        return task
+
+    async def _run(self, job: _Job):
+        await self._acquire(job)
+        try:
+            return await job.factory()
+        finally:
+            self._release(job)
+
+    async def _acquire(self, job: _Job):
+        job.grant = asyncio.get_running_loop().create_future()
+        tenant = self._tenants.get(job.tenant)
+        if tenant is None:
+            tenant = self._tenants[job.tenant] = _Tenant(weight=self.weights.get(job.tenant, 1.0))
+        if not tenant.queued and not tenant.running:
+            # A tenant returning from idle must not bank credit for the time it was away
+            tenant.finish_tag = max(tenant.finish_tag, self._virtual_time)
+        tenant.queues.setdefault(job.user_id, deque()).append(job)
+        self._grant()
+        try:
+            await job.grant
+        except asyncio.CancelledError:
+            if job.grant.done() and not job.grant.cancelled():
+                self._release(job)
+            else:
+                self._dequeue(job)
+            raise
+
+    def _release(self, job: _Job):
+        tenant = self._tenants[job.tenant]
+        tenant.running -= 1
+        self._running -= 1
+        self._user_running[job.user_id] -= 1
+        if not self._user_running[job.user_id]:
+            del self._user_running[job.user_id]
+        self._forget_if_idle(job.tenant)
+        self._grant()
+
+    def _dequeue(self, job: _Job):
+        tenant = self._tenants.get(job.tenant)
+        queue = tenant.queues.get(job.user_id) if tenant else None
+        if queue and job in queue:
+            queue.remove(job)
+            if not queue:
+                del tenant.queues[job.user_id]
+            self._forget_if_idle(job.tenant)
+
+    def _forget_if_idle(self, key: str):
+        tenant = self._tenants[key]
+        if not tenant.running and not tenant.queues and tenant.weight == 1.0:
+            # Default-weight tenants are recreated on demand; keeps the table bounded
+            del self._tenants[key]
+
+    def _eligible_user(self, tenant: _Tenant) -> Optional[str]:
+        for user_id, queue in tenant.queues.items():
+            if queue and self._user_running.get(user_id, 0) < self.max_per_user:
+                return user_id
+        return None
+
+    def _grant(self):
+        while self._running < self.max_concurrency:
+            best = None
+            for key, tenant in self._tenants.items():
+                if tenant.running >= self.max_per_tenant:
+                    continue
+                user_id = self._eligible_user(tenant)
+                if user_id is None:
+                    continue
+                start = max(tenant.finish_tag, self._virtual_time)
+                finish = start + 1.0 / tenant.weight
+                if best is None or finish < best[0]:
+                    best = (finish, start, key, user_id)
+            if best is None:
+                return
+
+            finish, start, key, user_id = best
+            tenant = self._tenants[key]
+            queue = tenant.queues[user_id]
+            job = queue.popleft()
+            # Rotate the user to the back so users within a tenant take turns
+            del tenant.queues[user_id]
+            if queue:
+                tenant.queues[user_id] = queue
+
+            tenant.finish_tag = finish
+            self._virtual_time = start
+            tenant.running += 1
+            self._running += 1
+            self._user_running[user_id] = self._user_running.get(user_id, 0) + 1
+            job.grant.set_result(None)
+
+    def cancel(self, key: str) -> bool:
+        """Cancel a queued or running job. Safe to call from any thread."""
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        task.get_loop().call_soon_threadsafe(task.cancel)
+        return True
+
+    def holds(self, key: str) -> bool:
+        """Whether this process has the job queued or running."""
+        task = self._tasks.get(key)
+        return task is not None and not task.done()
+
+    def depth(self, user_id: str, firm: Optional[str]) -> dict:
+        """Queued and running job counts for a user and their tenant."""
+        tenant = self._tenants.get(tenant_key(user_id, firm))
+        user_queue = tenant.queues.get(user_id, ()) if tenant else ()
+        return {
+            "tenant_queued": tenant.queued if tenant else 0,
+            "tenant_running": tenant.running if tenant else 0,
+            "user_queued": len(user_queue),
+            "user_running": self._user_running.get(user_id, 0),
+        }
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Queue depth per tenant, for metrics."""
+        return {key: {"queued": t.queued, "running": t.running} for key, t in self._tenants.items()}
+
+
+scheduler = FairScheduler(
+    max_concurrency=settings.scheduler_max_concurrency,
+    max_per_tenant=settings.scheduler_max_per_tenant,
+    max_per_user=settings.scheduler_max_per_user,
+    weights=settings.scheduler_tenant_weights,
+)
+
+metrics.register_gauge(
+    "silk_scheduler_queued_jobs",
+    lambda: {metrics.labels(tenant=k): v["queued"] for k, v in scheduler.snapshot().items()},
+)
+metrics.register_gauge(
+    "silk_scheduler_running_jobs",
+    lambda: {metrics.labels(tenant=k): v["running"] for k, v in scheduler.snapshot().items()},
+)
@@ -0,0 +1,194 @@
+"""
+Full-text search over case titles, anonymized briefs and report fields.
+SQLite uses an FTS5 virtual table; Postgres uses a weighted tsvector with a GIN index.
+The index lives outside the ORM models and is created/dropped alongside Base.metadata.
+
+It holds the one uncompressed copy of each anonymized brief, deliberately: FTS5
+reads the stored text for snippet() and to drop a row's postings when the case is
+re-indexed (contentless tables cannot delete rows before SQLite 3.43), and the
+Postgres tsvector is generated from it (where TOAST compresses the copy anyway).
+"""
+import html
+from typing import List, Tuple
+
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Session
+
+from database import Base
+
+# Snippets are HTML: escaped case text with matches wrapped in these tags (see _snippet_html)
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+# What the database marks matches with; control characters that never reach the output
+_RAW_START = "\x02"
+_RAW_END = "\x03"
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS case_search USING fts5(
+        case_id UNINDEXED,
+        owner_id UNINDEXED,
+        title,
+        report,
+        brief,
+        tokenize = 'porter unicode61'
+    )""",
+]
+
+_POSTGRES_DDL = [
+    """CREATE TABLE IF NOT EXISTS case_search (
+        case_id VARCHAR PRIMARY KEY,
+        owner_id VARCHAR NOT NULL,
+        title TEXT,
+        report TEXT,
+        brief TEXT,
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(report, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(brief, '')), 'C')
+        ) STORED
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_case_search_document ON case_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_case_search_owner_id ON case_search (owner_id)",
+]
+
+for _stmt in _SQLITE_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _POSTGRES_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+event.listen(Base.metadata, "before_drop", DDL("DROP TABLE IF EXISTS case_search"))
+
+
+def _report_text(report) -> str:
+    if report is None:
+        return ""
+    parts = [
+        report.recommended_argument_style,
+        report.ruling_prediction,
+        report.recommended_approach,
+        *(report.risk_areas or []),
+        *(report.precedent_cases or []),
+        *(report.opposition_arguments or []),
+    ]
+    return "\n".join(p for p in parts if p)
+
+
+def index_case(db: Session, case) -> None:
+    """Insert or refresh the search document for a case. Runs in the caller's transaction."""
+    params = {
+        "case_id": case.id,
+        "owner_id": case.owner_id,
+        "title": case.title,
+        "report": _report_text(case.report),
+        "brief": case.brief_anonymized or "",
+    }
+    if db.bind.dialect.name == "postgresql":
+        db.execute(
+            text(
+                "INSERT INTO case_search (case_id, owner_id, title, report, brief) "
+                "VALUES (:case_id, :owner_id, :title, :report, :brief) "
+                "ON CONFLICT (case_id) DO UPDATE SET title = EXCLUDED.title, "
+                "report = EXCLUDED.report, brief = EXCLUDED.brief"
+            ),
+            params,
+        )
+    else:
+        db.execute(text("DELETE FROM case_search WHERE case_id = :case_id"), params)
+        db.execute(
+            text(
+                "INSERT INTO case_search (case_id, owner_id, title, report, brief) "
+                "VALUES (:case_id, :owner_id, :title, :report, :brief)"
+            ),
+            params,
+        )
+
+
+def remove_case(db: Session, case_id: str) -> None:
+    db.execute(text("DELETE FROM case_search WHERE case_id = :case_id"), {"case_id": case_id})
+
+
+def _snippet_html(raw: str) -> str:
+    """
+    Escape a database snippet, then turn its raw match markers into SNIPPET_START/END.
+    Case text can hold anything (a brief may contain <img onerror=…>), so markup is
+    added only after escaping; the result is safe to render as HTML.
+    """
+    return html.escape(raw or "").replace(_RAW_START, SNIPPET_START).replace(_RAW_END, SNIPPET_END)
+
+
+def _fts5_query(query: str) -> str:
+    """Quote every term so user input is never parsed as FTS5 syntax."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    return " ".join(terms)
+
+
+def search_cases(
+    db: Session, owner_id: str, query: str, limit: int, offset: int
+) -> Tuple[int, List[Tuple[str, str, float]]]:
+    """
+    Ranked search scoped to one owner.
+    Returns (total_hits, [(case_id, snippet, score), ...]) with higher scores ranking first;
+    snippets are HTML-escaped with matches in SNIPPET_START/SNIPPET_END.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return _search_postgres(db, owner_id, query, limit, offset)
+    return _search_sqlite(db, owner_id, query, limit, offset)
+
+
+def _search_sqlite(db: Session, owner_id: str, query: str, limit: int, offset: int):
+    match = _fts5_query(query)
+    if not match:
+        return 0, []
+    params = {
+        "match": match, "owner_id": owner_id, "limit": limit, "offset": offset,
+        "start": _RAW_START, "end": _RAW_END,
+    }
+
+    total = db.execute(
+        text("SELECT count(*) FROM case_search WHERE case_search MATCH :match AND owner_id = :owner_id"),
+        params,
+    ).scalar()
+    rows = db.execute(
+        text(
+            "SELECT case_id, "
+            "snippet(case_search, -1, :start, :end, '…', 16), "
+            "bm25(case_search, 0.0, 0.0, 10.0, 4.0, 1.0) AS rank "
+            "FROM case_search WHERE case_search MATCH :match AND owner_id = :owner_id "
+            "ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        params,
+    ).all()
+    # bm25() is lower-is-better; flip it so callers can treat every backend alike
+    return total, [(case_id, _snippet_html(snippet), -rank) for case_id, snippet, rank in rows]
+
+
+def _search_postgres(db: Session, owner_id: str, query: str, limit: int, offset: int):
+    params = {
+        "query": query, "owner_id": owner_id, "limit": limit, "offset": offset,
+        "options": f"StartSel={_RAW_START}, StopSel={_RAW_END}, MaxFragments=2, MaxWords=20",
+    }
+
+    total = db.execute(
+        text(
+            "SELECT count(*) FROM case_search "
+            "WHERE owner_id = :owner_id AND document @@ websearch_to_tsquery('english', :query)"
+        ),
+        params,
+    ).scalar()
+    rows = db.execute(
+        text(
+            "WITH hits AS ("
+            "  SELECT case_id, title, report, brief, "
+            "         ts_rank_cd(document, websearch_to_tsquery('english', :query)) AS rank "
+            "  FROM case_search "
+            "  WHERE owner_id = :owner_id AND document @@ websearch_to_tsquery('english', :query) "
+            "  ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+            ") "
+            "SELECT case_id, ts_headline('english', concat_ws(' … ', title, report, brief), "
+            "       websearch_to_tsquery('english', :query), "
+            "       :options), "
+            "       rank "
+            "FROM hits ORDER BY rank DESC"
+        ),
+        params,
+    ).all()
+    return total, [(case_id, _snippet_html(snippet), float(rank)) for case_id, snippet, rank in rows]
@@ -0,0 +1,155 @@
+"""
+Near-duplicate case retrieval using MinHash signatures and LSH banding.
+Runs entirely on-box: signatures are computed with NumPy and bucket lookups
+are served from an indexed table, so query cost depends on the number of
+colliding candidates rather than the total number of briefs.
+"""
+import hashlib
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from models import AnalysisReport, CaseSignature, CaseLshBucket
+
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+MAX_CANDIDATES = 200
+MIN_SIMILARITY = 0.3
+
+_PRIME = (1 << 31) - 1
+_CHUNK = 4096
+
+# Fixed seed: signatures are persisted, so the permutations must be identical across processes and deploys
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+_TOKEN = re.compile(r"\[[A-Z_]+\]|\w+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    tokens = [t.lower() for t in _TOKEN.findall(text)]
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = [" ".join(tokens)] if tokens else []
+    else:
+        shingles = [" ".join(tokens[i : i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return np.unique(hashes % _PRIME)
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of the text's word shingles, or None if the text has no tokens."""
+    hashes = _shingle_hashes(text)
+    if hashes.size == 0:
+        return None
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    # Chunked so a 200-page brief never materialises a NUM_PERM x n_shingles matrix at once
+    for i in range(0, hashes.size, _CHUNK):
+        chunk = hashes[i : i + _CHUNK]
+        permuted = (_A[:, None] * chunk[None, :] + _B[:, None]) % _PRIME
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def _band_keys(signature: np.ndarray) -> List[Tuple[int, int]]:
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND].tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, "big", signed=True)))
+    return keys
+
+
+def index_case(db: Session, case) -> None:
+    """(Re)index a case's anonymized brief. Runs in the caller's transaction."""
+    store_signature(db, case, minhash_signature(case.brief_anonymized or ""))
+
+
+def store_signature(db: Session, case, signature: Optional[np.ndarray]) -> None:
+    """index_case() with the signature computed elsewhere, e.g. in a worker process."""
+    remove_case(db, case.id)
+    if signature is None:
+        return
+    db.add(CaseSignature(case_id=case.id, owner_id=case.owner_id, signature=signature.tobytes()))
+    db.add_all(
+        CaseLshBucket(owner_id=case.owner_id, band=band, bucket=bucket, case_id=case.id)
+        for band, bucket in _band_keys(signature)
+    )
+
+
+def remove_case(db: Session, case_id: str) -> None:
+    db.query(CaseLshBucket).filter(CaseLshBucket.case_id == case_id).delete(synchronize_session=False)
+    db.query(CaseSignature).filter(CaseSignature.case_id == case_id).delete(synchronize_session=False)
+
+
+def find_similar(db: Session, case, limit: int = 5) -> Optional[List[Tuple[str, float]]]:
+    """
+    Nearest prior cases from the same owner, as [(case_id, estimated_jaccard), ...].
+    Returns None if the case has not been indexed yet.
+    """
+    row = db.query(CaseSignature).filter(CaseSignature.case_id == case.id).first()
+    if row is None:
+        return None
+    signature = np.frombuffer(row.signature, dtype=np.uint32)
+
+    collisions = {}
+    hits = (
+        db.query(CaseLshBucket.case_id)
+        .filter(
+            CaseLshBucket.owner_id == case.owner_id,
+            tuple_(CaseLshBucket.band, CaseLshBucket.bucket).in_(_band_keys(signature)),
+            CaseLshBucket.case_id != case.id,
+        )
+        .all()
+    )
+    for (candidate_id,) in hits:
+        collisions[candidate_id] = collisions.get(candidate_id, 0) + 1
+    candidates = sorted(collisions, key=collisions.get, reverse=True)[:MAX_CANDIDATES]
+    if not candidates:
+        return []
+
+    scored = []
+    for candidate_id, blob in (
+        db.query(CaseSignature.case_id, CaseSignature.signature).filter(CaseSignature.case_id.in_(candidates))
+    ):
+        similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+        if similarity >= MIN_SIMILARITY:
+            scored.append((candidate_id, round(similarity, 3)))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
+
+
+def prior_analysis_context(matches: List[Tuple[float, object]], max_chars: int = 400) -> str:
+    """Compact summary of prior reports for inclusion in the analysis prompt."""
+
+    def clip(value: Optional[str]) -> str:
+        value = (value or "").strip()
+        return value if len(value) <= max_chars else value[: max_chars - 1] + "…"
+
+    lines = []
+    for similarity, report in matches:
+        lines.append(
+            f"- Similarity {similarity:.2f} | Style: {clip(report.recommended_argument_style)} | "
+            f"Predicted ruling: {clip(report.ruling_prediction)} | "
+            f"Approach: {clip(report.recommended_approach)}"
+        )
+    return "\n".join(lines)
+
+
+def build_prior_context(db: Session, case, limit: int = 3) -> Optional[str]:
+    """Prompt context from the current reports of the closest prior cases, or None if there are none."""
+    matches = find_similar(db, case, limit=limit * 2) or []
+    reports = {
+        r.case_id: r
+        for r in db.query(AnalysisReport).filter(
+            AnalysisReport.case_id.in_([m for m, _ in matches]), AnalysisReport.is_current.is_(True)
+        )
+    }
+    prior = [(score, reports[match_id]) for match_id, score in matches if match_id in reports][:limit]
+    return prior_analysis_context(prior) if prior else None
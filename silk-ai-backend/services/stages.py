@@ -0,0 +1,71 @@
+"""
+Persisted checkpoints for the case-processing pipeline.
+
+Each case moves through ANONYMIZED → ANALYSED → PERSISTED. A stage row records
+its status, attempt count and last error; the analysis result is kept on the
+ANALYSED row until it has been persisted, so a retry after a failure re-runs
+only the stage that failed. Stage helpers run in the caller's transaction.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from models import CaseStage
+
+ANONYMIZED = "anonymized"
+ANALYSED = "analysed"
+PERSISTED = "persisted"
+STAGES = (ANONYMIZED, ANALYSED, PERSISTED)
+
+_MAX_ERROR_CHARS = 2000
+
+
+def load(db: Session, case_id: str) -> Dict[str, CaseStage]:
+    return {s.stage: s for s in db.query(CaseStage).filter(CaseStage.case_id == case_id)}
+
+
+def completed(db: Session, case_id: str) -> Dict[str, Any]:
+    """{stage: output} for every completed stage of a case."""
+    return {name: s.output for name, s in load(db, case_id).items() if s.status == "complete"}
+
+
+def reset(db: Session, case_id: str) -> None:
+    """Forget all checkpoints, e.g. after the brief changed."""
+    db.query(CaseStage).filter(CaseStage.case_id == case_id).delete(synchronize_session=False)
+
+
+def start(db: Session, case_id: str, stage: str) -> None:
+    row = db.get(CaseStage, (case_id, stage))
+    if row is None:
+        row = CaseStage(case_id=case_id, stage=stage, position=STAGES.index(stage), attempts=0)
+        db.add(row)
+    row.status = "running"
+    row.attempts += 1
+    row.error = None
+    row.started_at = datetime.utcnow()
+    row.finished_at = None
+
+
+def complete(db: Session, case_id: str, stage: str, output: Optional[Any] = None) -> None:
+    row = db.get(CaseStage, (case_id, stage))
+    row.status = "complete"
+    row.output = output
+    row.finished_at = datetime.utcnow()
+
+
+def discard_output(db: Session, case_id: str, stage: str) -> None:
+    row = db.get(CaseStage, (case_id, stage))
+    if row is not None:
+        row.output = None
+
+
+def fail_running(db: Session, case_id: str, error: str) -> Optional[str]:
+    """Mark the case's in-flight stage failed. Returns the stage name, if any was running."""
+    row = db.query(CaseStage).filter(CaseStage.case_id == case_id, CaseStage.status == "running").first()
+    if row is None:
+        return None
+    row.status = "failed"
+    row.error = error[:_MAX_ERROR_CHARS]
+    row.finished_at = datetime.utcnow()
+    return row.stage
@@ -0,0 +1,183 @@
+"""
+Streaming multipart uploads.
+
+FastAPI's File/Form parameters read the whole request body into spooled temp files
+before the endpoint runs, so no size limit can stop an upload early. receive_multipart()
+parses request.stream() as it arrives instead, rejects on Content-Length up front, and
+writes each file straight into its spool file, stopping as soon as the limit is passed.
+"""
+import asyncio
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Allowance for boundaries, part headers and text fields on top of the file budget
+FORM_OVERHEAD_BYTES = 64 * 1024
+_WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UnsupportedUpload(Exception):
+    pass
+
+
+class MalformedUpload(Exception):
+    pass
+
+
+@dataclass
+class SpooledUpload:
+    field: str
+    filename: str
+    path: str
+    size: int = 0
+
+
+@dataclass
+class _Part:
+    headers: Dict[bytes, bytes] = field(default_factory=dict)
+    name: str = ""
+    upload: Optional[SpooledUpload] = None
+    data: bytearray = field(default_factory=bytearray)
+
+
+class _Receiver:
+    """MultipartParser callbacks. File data is buffered here and written by the caller, off the loop."""
+
+    def __init__(self, directory: str, max_file_bytes: int, extensions: Iterable[str]):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.extensions = set(extensions)
+        self.fields: Dict[str, str] = {}
+        self.files: List[SpooledUpload] = []
+        self.pending: List[Tuple[SpooledUpload, bytes]] = []
+        self.file_bytes = 0
+        self.complete = False
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_end": self.on_end,
+        }
+
+    def on_part_begin(self):
+        self._part = _Part()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._part.headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._part.headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise MalformedUpload("Content-Disposition must name the field")
+        self._part.name = options[b"name"].decode("utf-8", "replace")
+        if b"filename" in options:
+            filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+            ext = os.path.splitext(filename.lower())[1]
+            # Rejected before any of its content is received
+            if ext not in self.extensions:
+                raise UnsupportedUpload(f"Unsupported file type: {filename}")
+            path = os.path.join(self.directory, f"{len(self.files)}{ext}")
+            self._part.upload = SpooledUpload(field=self._part.name, filename=filename, path=path)
+            self.files.append(self._part.upload)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        chunk = data[start:end]
+        upload = self._part.upload
+        if upload is None:
+            self._part.data += chunk
+            if len(self._part.data) > FORM_OVERHEAD_BYTES:
+                raise UploadTooLarge(f"Form field {self._part.name} is too large")
+            return
+        self.file_bytes += len(chunk)
+        if self.file_bytes > self.max_file_bytes:
+            raise UploadTooLarge()
+        upload.size += len(chunk)
+        self.pending.append((upload, chunk))
+
+    def on_part_end(self):
+        if self._part.upload is None:
+            self.fields[self._part.name] = self._part.data.decode("utf-8", "replace")
+
+    def on_end(self):
+        self.complete = True
+
+
+def _write(pending: List[Tuple[SpooledUpload, bytes]]):
+    for upload, chunk in pending:
+        with open(upload.path, "ab") as f:
+            f.write(chunk)
+
+
+@asynccontextmanager
+async def receive_multipart(request: Request, max_file_bytes: int, extensions: Iterable[str]):
+    """
+    Yield (fields, files) for a multipart/form-data request, where files are SpooledUpload
+    records on disk. Raises UploadTooLarge as soon as the files exceed ``max_file_bytes``,
+    UnsupportedUpload for a file whose extension is not in ``extensions``, and
+    MalformedUpload for anything that isn't a well-formed multipart body. Spool files are
+    removed when the block exits.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise MalformedUpload("Expected a multipart/form-data body")
+    max_body_bytes = max_file_bytes + FORM_OVERHEAD_BYTES
+    try:
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise MalformedUpload("Invalid Content-Length")
+    if declared > max_body_bytes:
+        raise UploadTooLarge()
+
+    with tempfile.TemporaryDirectory(prefix="silk-upload-") as directory:
+        receiver = _Receiver(directory, max_file_bytes, extensions)
+        parser = MultipartParser(options[b"boundary"], receiver.callbacks())
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body_bytes:
+                    raise UploadTooLarge()
+                parser.write(chunk)
+                if sum(len(data) for _, data in receiver.pending) >= _WRITE_CHUNK_SIZE:
+                    await asyncio.to_thread(_write, receiver.pending)
+                    receiver.pending = []
+            parser.finalize()
+        except FormParserError as e:
+            raise MalformedUpload(str(e))
+        if not receiver.complete:
+            raise MalformedUpload("Incomplete multipart body")
+        # Empty files still get a spool file
+        await asyncio.to_thread(_write, receiver.pending + [(upload, b"") for upload in receiver.files])
+        receiver.pending = []
+        yield receiver.fields, receiver.files
@@ -0,0 +1,135 @@
+"""
+Token and cost ledger for outbound Claude calls, and budget enforcement.
+
+Every call site records ``message.usage`` through record(); the case and owner it
+is charged to come from a context variable set by the pipeline (attribute_to), so
+the concurrent paragraph-verification calls of one case are all attributed to it.
+Budgets are checked against the ledger before work is scheduled and again before
+each expensive stage.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import write_session
+from models import UsageLedgerEntry
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: (input, output). Cache writes and reads are priced off the input rate.
+PRICING = {
+    "claude-opus-4-5": (5.00, 25.00),
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+
+_attribution: ContextVar[Optional[dict]] = ContextVar("usage_attribution", default=None)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def attribute_to(owner_id: Optional[str], firm: Optional[str] = None, case_id: Optional[str] = None) -> None:
+    """Charge Claude calls made from the current task (and tasks it spawns) to this owner/case."""
+    _attribution.set({"owner_id": owner_id, "firm": firm or None, "case_id": case_id})
+
+
+def estimate_cost(
+    model: str, input_tokens: int, output_tokens: int, cache_write: int = 0, cache_read: int = 0
+) -> float:
+    if model not in PRICING:
+        logger.warning(f"No pricing for model {model} — recording usage at zero cost")
+        return 0.0
+    input_rate, output_rate = PRICING[model]
+    return (
+        input_tokens * input_rate
+        + cache_write * input_rate * CACHE_WRITE_MULTIPLIER
+        + cache_read * input_rate * CACHE_READ_MULTIPLIER
+        + output_tokens * output_rate
+    ) / 1_000_000
+
+
+def record(message, model: str, purpose: str, started: float) -> None:
+    """Add a ledger row for one Claude response. ``started`` is the time.monotonic() before the call."""
+    usage = getattr(message, "usage", None)
+    if usage is None:
+        return
+    tokens = {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+    }
+    cost = estimate_cost(
+        model,
+        tokens["input_tokens"],
+        tokens["output_tokens"],
+        tokens["cache_creation_input_tokens"],
+        tokens["cache_read_input_tokens"],
+    )
+    metrics.inc("silk_claude_tokens_total", tokens["input_tokens"], model=model, purpose=purpose, kind="input")
+    metrics.inc("silk_claude_tokens_total", tokens["output_tokens"], model=model, purpose=purpose, kind="output")
+    metrics.inc("silk_claude_cost_usd_total", cost, model=model, purpose=purpose)
+
+    attribution = _attribution.get() or {}
+    try:
+        with write_session() as db:
+            db.add(UsageLedgerEntry(
+                owner_id=attribution.get("owner_id"),
+                firm=attribution.get("firm"),
+                case_id=attribution.get("case_id"),
+                purpose=purpose,
+                model=model,
+                latency_ms=int((time.monotonic() - started) * 1000),
+                cost_usd=cost,
+                **tokens,
+            ))
+    except Exception as e:
+        # The call has already been paid for; losing a ledger row must not fail the case
+        logger.error(f"Failed to record Claude usage: {e}")
+
+
+def period_start(now: Optional[datetime] = None) -> datetime:
+    """Budgets run per calendar month (UTC)."""
+    now = now or datetime.utcnow()
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def spent(db: Session, since: datetime, owner_id: Optional[str] = None, firm: Optional[str] = None) -> float:
+    query = db.query(func.coalesce(func.sum(UsageLedgerEntry.cost_usd), 0.0)).filter(
+        UsageLedgerEntry.created_at >= since
+    )
+    if owner_id is not None:
+        query = query.filter(UsageLedgerEntry.owner_id == owner_id)
+    if firm is not None:
+        query = query.filter(UsageLedgerEntry.firm == firm)
+    return float(query.scalar())
+
+
+def firm_budget(firm: Optional[str]) -> float:
+    if not firm:
+        return 0.0
+    return settings.usage_firm_budgets_usd.get(firm, settings.usage_budget_firm_usd)
+
+
+def check_budget(db: Session, owner_id: str, firm: Optional[str]) -> None:
+    """
+    Raise BudgetExceeded if the user's or their firm's spend this month has reached its budget.
+    Pass the owner's verified firm (User.verified_firm), never the self-declared one.
+    """
+    since = period_start()
+    if settings.usage_budget_user_usd > 0 and spent(db, since, owner_id=owner_id) >= settings.usage_budget_user_usd:
+        metrics.inc("silk_budget_rejections_total", scope="user")
+        raise BudgetExceeded(f"Monthly usage budget of ${settings.usage_budget_user_usd:,.2f} reached")
+    budget = firm_budget(firm)
+    if budget > 0 and spent(db, since, firm=firm) >= budget:
+        metrics.inc("silk_budget_rejections_total", scope="firm")
+        raise BudgetExceeded(f"Firm monthly usage budget of ${budget:,.2f} reached")
@@ -0,0 +1,174 @@
+"""
+Firm- and user-defined entity watchlists, compiled into an Aho-Corasick automaton.
+Applied as a deterministic pre-pass in anonymize(): every listed term is redacted
+in a single linear scan, however many terms there are.
+Uses the pyahocorasick C extension when installed, otherwise a pure-Python automaton.
+"""
+import hashlib
+import logging
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models import User, WatchlistTerm
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+    logger.info("pyahocorasick not installed — using pure-Python watchlist automaton")
+
+PLACEHOLDER = re.compile(r"\[[A-Z_]+\]")
+
+
+def _lower(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. "İ") lower to two code points; keep offsets aligned with the original
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class _PyAutomaton:
+    """Minimal Aho-Corasick automaton yielding (end_index, (length, replacement)) like pyahocorasick."""
+
+    def __init__(self, patterns: Dict[str, Tuple[int, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for word, value in patterns.items():
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(value)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for value in out[node]:
+                yield i, value
+
+
+class WatchlistRedactor:
+    """Compiled watchlist. ``fingerprint`` changes whenever the term set does."""
+
+    def __init__(self, terms: Iterable[Tuple[str, str]]):
+        # Kept so worker processes can rebuild the automaton (see compile_watchlist)
+        self.terms = tuple(terms)
+        patterns: Dict[str, Tuple[int, str]] = {}
+        for term, replacement in self.terms:
+            key = _lower(term.strip())
+            if key:
+                patterns[key] = (len(key), replacement)
+        self.size = len(patterns)
+        self.fingerprint = hashlib.sha256(
+            "\0".join(f"{k}\x1f{v[1]}" for k, v in sorted(patterns.items())).encode("utf-8")
+        ).hexdigest()[:16] if patterns else ""
+
+        if not patterns:
+            self._automaton = None
+        elif ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for key, value in patterns.items():
+                self._automaton.add_word(key, value)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = _PyAutomaton(patterns)
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """Leftmost-longest, non-overlapping whole-word matches as (start, end, replacement)."""
+        if self._automaton is None or not text:
+            return []
+        matches = []
+        for end_index, (length, replacement) in self._automaton.iter(_lower(text)):
+            start, end = end_index - length + 1, end_index + 1
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            matches.append((start, end, replacement))
+
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected, cursor = [], 0
+        for start, end, replacement in matches:
+            if start >= cursor:
+                selected.append((start, end, replacement))
+                cursor = end
+        return selected
+
+    def redact(self, text: str) -> str:
+        spans = self.find(text)
+        if not spans:
+            return text
+        parts, cursor = [], 0
+        for start, end, replacement in spans:
+            parts.append(text[cursor:start])
+            parts.append(replacement)
+            cursor = end
+        parts.append(text[cursor:])
+        return "".join(parts)
+
+
+@lru_cache(maxsize=64)
+def _compile(terms: Tuple[Tuple[str, str], ...]) -> WatchlistRedactor:
+    return WatchlistRedactor(terms)
+
+
+def compile_watchlist(terms: Iterable[Tuple[str, str]]) -> WatchlistRedactor:
+    """Compile (or fetch from cache) the automaton for a set of (term, replacement) pairs."""
+    return _compile(tuple(sorted(set(terms))))
+
+
+def visible_terms(user: User):
+    """Filter for the terms ``user`` may list and delete: their own, plus their verified firm's."""
+    scope = WatchlistTerm.owner_id == user.id
+    if user.verified_firm:
+        scope = or_(scope, WatchlistTerm.firm == user.verified_firm)
+    return scope
+
+
+def load_watchlist(db: Session, user: User) -> WatchlistRedactor:
+    """
+    Compiled redactor for every term that applies to ``user``: their own, plus firm terms
+    added by verified members of their verified firm. Anything but a placeholder
+    replacement is ignored, so stored text can never be spliced into a brief.
+    """
+    scope = WatchlistTerm.owner_id == user.id
+    if user.verified_firm:
+        author = db.query(User.id).filter(
+            User.id == WatchlistTerm.owner_id, User.firm == WatchlistTerm.firm, User.firm_verified.is_(True)
+        )
+        scope = or_(scope, and_(WatchlistTerm.firm == user.verified_firm, author.exists()))
+    rows = db.query(WatchlistTerm.term, WatchlistTerm.replacement).filter(scope).all()
+    return compile_watchlist(
+        (term, replacement) for term, replacement in rows if PLACEHOLDER.fullmatch(replacement)
+    )
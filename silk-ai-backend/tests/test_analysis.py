@@ -0,0 +1,106 @@
+import io
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from database import Base, engine, init_db, SessionLocal
+from models import Case, AnalysisReport
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_db(tmp_path):
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    with patch("services.pdf_service.settings.pdf_cache_dir", str(tmp_path)):
+        yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _token_and_cases(count):
+    reg = client.post("/auth/register", json={
+        "email": "partner@test.com", "password": "pass123", "full_name": "Test Partner",
+    }).json()
+    db = SessionLocal()
+    ids = []
+    for i in range(count):
+        case = Case(owner_id=reg["user"]["id"], title=f"Matter {i}", brief_raw="x", status="complete")
+        db.add(case)
+        db.flush()
+        db.add(AnalysisReport(case_id=case.id, recommended_approach=f"Approach {i}"))
+        ids.append(case.id)
+    db.commit()
+    db.close()
+    return reg["access_token"], ids
+
+
+def test_export_streams_zip_of_report_pdfs(tmp_path):
+    token, ids = _token_and_cases(3)
+    response = client.post(
+        "/analysis/export",
+        json={"case_ids": ids + ["unknown-id"]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = archive.namelist()
+    assert len(names) == 3
+    assert all(archive.read(name).startswith(b"%PDF") for name in names)
+    # Rendered by worker processes into the configured cache, not their own default
+    assert len(list(tmp_path.glob("*.pdf"))) == 3
+
+
+def test_export_requires_completed_cases():
+    reg = client.post("/auth/register", json={
+        "email": "empty@test.com", "password": "pass123", "full_name": "Empty",
+    }).json()
+    response = client.post(
+        "/analysis/export",
+        json={"case_ids": ["missing"]},
+        headers={"Authorization": f"Bearer {reg['access_token']}"},
+    )
+    assert response.status_code == 404
+
+
+def test_get_analysis_supports_conditional_requests():
+    token, ids = _token_and_cases(1)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.get(f"/analysis/{ids[0]}", headers=headers)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert "last-modified" in first.headers
+
+    cached = client.get(f"/analysis/{ids[0]}", headers={**headers, "If-None-Match": first.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == first.headers["etag"]
+
+    stale = client.get(f"/analysis/{ids[0]}", headers={**headers, "If-None-Match": '"something-else"'})
+    assert stale.status_code == 200
+
+
+def test_pdf_is_rerendered_after_title_change(tmp_path):
+    from services import pdf_service
+
+    token, ids = _token_and_cases(1)
+    headers = {"Authorization": f"Bearer {token}"}
+    render = patch.object(
+        pdf_service, "generate_strategy_report_pdf", wraps=pdf_service.generate_strategy_report_pdf
+    )
+    with render as generate:
+        assert client.get(f"/analysis/{ids[0]}/pdf", headers=headers).status_code == 200
+        assert client.get(f"/analysis/{ids[0]}/pdf", headers=headers).status_code == 200
+        assert generate.call_count == 1
+
+        assert client.patch(f"/cases/{ids[0]}", json={"title": "Renamed"}, headers=headers).status_code == 200
+        response = client.get(f"/analysis/{ids[0]}/pdf", headers=headers)
+        assert response.status_code == 200
+        assert generate.call_count == 2
+        assert generate.call_args.args[0] == "Renamed"
+    assert len(list(tmp_path.glob("*.pdf"))) == 1
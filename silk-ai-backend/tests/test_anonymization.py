@@ -19,3 +19,163 @@ def test_pattern_pass_preserves_non_pii():
     text = "The defendant breached the contractual obligation to deliver goods."
     result = _pattern_pass(text)
     assert result == text
+
+
+@pytest.mark.asyncio
+async def test_anonymize_incremental_reuses_cached_paragraphs():
+    from unittest.mock import patch
+    from services.anonymization import anonymize_incremental, paragraph_hash
+
+    first = "The claimant paid $1,500,000.\n\nThe defendant refused delivery."
+    cache = {paragraph_hash("The claimant paid $1,500,000."): "The claimant paid [AMOUNT]."}
+
+    with patch("services.anonymization._ner_spans", return_value=[]), \
+            patch("services.anonymization.settings.ner_workers", 0):
+        result, new_entries = await anonymize_incremental(first, None, cache)
+
+    assert result == "The claimant paid [AMOUNT].\n\nThe defendant refused delivery."
+    assert list(new_entries) == [paragraph_hash("The defendant refused delivery.")]
+
+
+@pytest.mark.asyncio
+async def test_anonymize_incremental_does_not_cache_unverified_paragraphs():
+    from unittest.mock import AsyncMock, patch
+    from services.anonymization import anonymize_incremental, paragraph_hash
+
+    text = "The defendant refused delivery.\n\nThe claimant met Alice Wong on site."
+    verify = AsyncMock(side_effect=RuntimeError("overloaded"))
+    with patch("services.anonymization._ner_spans", return_value=[]), \
+            patch("services.anonymization.settings.ner_workers", 0), \
+            patch("services.anonymization._claude_verification_pass", verify):
+        result, new_entries = await anonymize_incremental(text, object(), {})
+
+    assert result == text
+    assert list(new_entries) == [paragraph_hash("The defendant refused delivery.")]
+
+
+def test_residual_risk_ignores_placeholders_and_flags_leftover_pii():
+    from services.anonymization import residual_risk
+
+    clean, _ = residual_risk("[PERSON] sued [ORGANISATION] in the High Court under Section 4 of the Act.")
+    assert clean == 0
+    score, signals = residual_risk("The claimant met Mr Hargreaves and emailed j.doe@example.com.")
+    assert signals["titled_name"] == 1 and signals["email"] == 1
+    assert score >= 3
+
+
+def test_residual_risk_flags_lone_sentence_initial_and_uppercase_names():
+    from services.anonymization import residual_risk
+    from config import settings
+
+    for text in (
+        "The witness then called Hargreaves.",
+        "Hargreaves told the court that the goods never arrived.",
+        "The claimant called JOHN SMITH about the NHS invoice.",
+    ):
+        assert residual_risk(text)[0] >= settings.pii_verification_threshold, text
+    assert residual_risk("The defendant told the court that the NHS invoice was paid.")[0] == 0
+
+
+def test_residual_risk_needs_evidence_for_position_or_capitals():
+    from config import settings
+    from services.anonymization import lowercase_vocabulary, residual_risk
+
+    brief = "The claimant seeks damages and costs following the hearing.\n\nDAMAGES\n\nHargreaves told the court."
+    vocabulary = lowercase_vocabulary(brief)
+    for text in (
+        "However, the [ORGANISATION] failed to deliver.",
+        "Accordingly, we submit that the appeal should be allowed.",
+        "Following the hearing, the parties exchanged letters.",
+        "Damages are sought for the delay.",
+        "DAMAGES",
+    ):
+        assert residual_risk(text, vocabulary)[0] < settings.pii_verification_threshold, text
+    assert residual_risk("Hargreaves told the court.", vocabulary)[0] >= settings.pii_verification_threshold
+    assert residual_risk("The court then heard from Damages.", vocabulary)[0] >= settings.pii_verification_threshold
+
+
+@pytest.mark.asyncio
+async def test_anonymize_only_verifies_risky_paragraphs():
+    from unittest.mock import AsyncMock, patch
+    from services import metrics
+    from services.anonymization import anonymize
+
+    text = "The defendant refused delivery.\n\nThe claimant met Alice Wong on site."
+    skipped = metrics.counter_value("silk_anonymization_verification_total", decision="skipped")
+    made = metrics.counter_value("silk_anonymization_verification_calls_total", kind="made")
+    unfiltered = metrics.counter_value("silk_anonymization_verification_calls_total", kind="unfiltered")
+    verify = AsyncMock(return_value=["The claimant met [PERSON] on site."])
+
+    with patch("services.anonymization._ner_spans", return_value=[]), \
+            patch("services.anonymization.settings.ner_workers", 0), \
+            patch("services.anonymization._claude_verification_pass", verify):
+        result, verified = await anonymize(text, anthropic_client=object())
+
+    assert verified
+    assert result == "The defendant refused delivery.\n\nThe claimant met [PERSON] on site."
+    verify.assert_awaited_once()
+    assert verify.await_args.args[0] == ["The claimant met Alice Wong on site."]
+    assert metrics.counter_value("silk_anonymization_verification_total", decision="skipped") == skipped + 1
+    assert metrics.counter_value("silk_anonymization_verification_calls_total", kind="made") == made + 1
+    assert metrics.counter_value("silk_anonymization_verification_calls_total", kind="unfiltered") == unfiltered + 1
+
+
+@pytest.mark.asyncio
+async def test_verification_batches_paragraphs_and_applies_placeholder_replacements():
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock, patch
+    from services.anonymization import anonymize_paragraphs
+
+    paragraphs = [f"Counsel {n} met Alice Wong on site." for n in range(6)]
+    reply = '[{"paragraph": 2, "text": "Alice Wong", "replacement": "[PERSON]"},' \
+            ' {"paragraph": 1, "text": "Alice Wong", "replacement": "Bob"}]'
+    message = SimpleNamespace(content=[SimpleNamespace(text=reply)], stop_reason="end_turn")
+    fake_client = SimpleNamespace(messages=SimpleNamespace(create=AsyncMock(return_value=message)))
+
+    with patch("services.anonymization._ner_spans", return_value=[]), \
+            patch("services.anonymization.settings.ner_workers", 0), \
+            patch("services.anonymization.VERIFY_BATCH_CHARS", 3 * len(paragraphs[0])), \
+            patch("services.claude_service.rate_limiter.rate", 0):
+        results = await anonymize_paragraphs(paragraphs, fake_client)
+
+    assert fake_client.messages.create.await_count == 2
+    assert all(verified for _, verified in results)
+    assert results[0][0] == "Counsel 0 met [REDACTED] on site."
+    assert results[1][0] == "Counsel 1 met [PERSON] on site."
+    assert results[2][0] == paragraphs[2]
+
+    message.stop_reason = "max_tokens"
+    with patch("services.anonymization._ner_spans", return_value=[]), \
+            patch("services.anonymization.settings.ner_workers", 0), \
+            patch("services.claude_service.rate_limiter.rate", 0):
+        results = await anonymize_paragraphs(paragraphs, fake_client)
+    assert not any(verified for _, verified in results)
+
+
+def test_redaction_spans_merge_ner_and_pattern_matches():
+    from unittest.mock import patch
+    from services.anonymization import apply_spans, redaction_spans
+
+    text = "Jane Doe claims $1,500,000 from Smith v Jones."
+    ner_spans = [(0, 8, "[PERSON]"), (32, 37, "[PERSON]")]
+    with patch("services.anonymization._ner_spans", return_value=ner_spans):
+        spans = redaction_spans(text)
+    assert apply_spans(text, spans) == "[PERSON] claims [AMOUNT] from [CASE_NAME]."
+
+
+@pytest.mark.asyncio
+async def test_first_pass_runs_in_ner_process_pool():
+    from services.anonymization import anonymize
+    from services.executors import get_pool, shutdown_pools
+    from services.watchlist import compile_watchlist
+    from unittest.mock import patch
+
+    watchlist = compile_watchlist([("Harwood", "[ORGANISATION]")])
+    try:
+        with patch("services.anonymization.settings.ner_backend", "regex"), \
+                patch("services.anonymization.settings.ner_workers", 1):
+            result, _ = await anonymize("Mr Okafor paid $2,000 to Harwood.\n\nThe goods arrived.", None, watchlist)
+            assert get_pool("ner", 1)._mp_context.get_start_method() != "fork"
+    finally:
+        shutdown_pools()
+    assert result == "[PERSON] paid [AMOUNT] to [ORGANISATION].\n\nThe goods arrived."
@@ -2,7 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from main import app
-from database import Base, engine
+from database import Base, engine, init_db
 
 client = TestClient(app)
 
@@ -10,7 +10,7 @@ client = TestClient(app)
 @pytest.fixture(autouse=True)
 def reset_db():
     Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    init_db()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -55,3 +55,14 @@ def test_me_with_valid_token():
     response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
     assert response.json()["email"] == "me@test.com"
+
+
+def test_metrics_need_a_token_outside_development():
+    from unittest.mock import patch
+
+    assert client.get("/metrics").status_code == 200
+    with patch("main.settings.app_env", "production"):
+        assert client.get("/metrics").status_code == 401
+        with patch("main.settings.metrics_token", "s3cret"):
+            assert client.get("/metrics").status_code == 401
+            assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -3,7 +3,7 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock
 
 from main import app
-from database import Base, engine
+from database import Base, engine, init_db
 
 client = TestClient(app)
 
@@ -11,7 +11,7 @@ client = TestClient(app)
 @pytest.fixture(autouse=True)
 def reset_db():
     Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    init_db()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -25,6 +25,16 @@ def _get_token():
     return reg.json()["access_token"]
 
 
+def _run_id(case_id):
+    from database import SessionLocal
+    from models import Case
+
+    db = SessionLocal()
+    run_id = db.get(Case, case_id).run_id
+    db.close()
+    return run_id
+
+
 def test_create_case():
     token = _get_token()
     with patch("routers.cases._process_case", new_callable=AsyncMock):
@@ -66,3 +76,461 @@ def test_get_case_not_found():
 def test_cases_require_auth():
     response = client.get("/cases/")
     assert response.status_code == 401
+
+
+def test_update_case_reprocesses_changed_brief():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post(
+            "/cases/",
+            json={"title": "Case A", "brief_raw": "First paragraph."},
+            headers=headers,
+        ).json()
+
+    from database import SessionLocal
+    from models import Case
+    db = SessionLocal()
+    db.query(Case).filter(Case.id == case["id"]).update({"status": "complete"})
+    db.commit()
+    db.close()
+
+    with patch("routers.cases.scheduler.submit") as submit:
+        response = client.patch(
+            f"/cases/{case['id']}",
+            json={"brief_raw": "First paragraph.\n\nSecond paragraph."},
+            headers=headers,
+        )
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    submit.assert_called_once()
+    assert submit.call_args.args[0] == case["id"]
+
+
+def test_unverified_firm_claim_is_scheduled_as_its_own_tenant():
+    import cli
+    from services.scheduler import tenant_key
+
+    reg = client.post("/auth/register", json={
+        "email": "claimant@test.com", "password": "pass123", "full_name": "Claimant", "firm": "Denning Chambers",
+    }).json()
+    headers = {"Authorization": f"Bearer {reg['access_token']}"}
+    with patch("routers.cases.scheduler.submit") as submit:
+        client.post("/cases/", json={"title": "A", "brief_raw": "Brief."}, headers=headers)
+    assert tenant_key(*submit.call_args.args[1:3]) == f"user:{reg['user']['id']}"
+
+    assert cli.main(["verify-firm-member", "claimant@test.com", "--firm", "Denning Chambers"]) == 0
+    with patch("routers.cases.scheduler.submit") as submit:
+        client.post("/cases/", json={"title": "B", "brief_raw": "Brief."}, headers=headers)
+    assert tenant_key(*submit.call_args.args[1:3]) == "firm:denning chambers"
+
+
+def test_update_case_rejects_in_flight_case():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post(
+            "/cases/",
+            json={"title": "Case A", "brief_raw": "Brief content."},
+            headers=headers,
+        ).json()
+    response = client.patch(f"/cases/{case['id']}", json={"title": "Renamed"}, headers=headers)
+    assert response.status_code == 409
+
+
+def test_search_cases_ranks_and_scopes_to_owner():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        client.post("/cases/", json={"title": "Negligence claim", "brief_raw": "x"}, headers=headers)
+        client.post("/cases/", json={"title": "Supply contract dispute", "brief_raw": "x"}, headers=headers)
+
+    other = client.post("/auth/register", json={
+        "email": "other@test.com", "password": "pass123", "full_name": "Other"
+    }).json()["access_token"]
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        client.post(
+            "/cases/",
+            json={"title": "Another contract matter", "brief_raw": "x"},
+            headers={"Authorization": f"Bearer {other}"},
+        )
+
+    response = client.get("/cases/search", params={"q": "contract"}, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["hits"][0]["case"]["title"] == "Supply contract dispute"
+    assert "<mark>" in data["hits"][0]["snippet"]
+
+
+def test_search_snippets_escape_case_text():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        client.post("/cases/", json={"title": 'Contract <img src=x onerror="alert(1)">', "brief_raw": "x"}, headers=headers)
+
+    snippet = client.get("/cases/search", params={"q": "contract"}, headers=headers).json()["hits"][0]["snippet"]
+    assert snippet == '<mark>Contract</mark> &lt;img src=x onerror=&quot;alert(1)&quot;&gt;'
+
+
+def test_get_case_serializes_detail_and_compresses_large_payloads():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post(
+            "/cases/",
+            json={"title": "Case A", "brief_raw": "Brief content."},
+            headers=headers,
+        ).json()
+
+    from database import SessionLocal
+    from models import Case
+    db = SessionLocal()
+    db.query(Case).filter(Case.id == case["id"]).update({"brief_anonymized": "[PERSON] argued. " * 500})
+    db.commit()
+    db.close()
+
+    response = client.get(f"/cases/{case['id']}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    data = response.json()
+    assert data["id"] == case["id"]
+    assert data["report"] is None
+    assert data["brief_anonymized"].startswith("[PERSON] argued.")
+
+
+def test_process_case_times_out_and_marks_failed():
+    import asyncio
+    from database import SessionLocal
+    from models import Case
+    from routers.cases import _process_case
+    from services import metrics
+
+    token = _get_token()
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post(
+            "/cases/",
+            json={"title": "Slow", "brief_raw": "Brief content."},
+            headers={"Authorization": f"Bearer {token}"},
+        ).json()
+
+    async def slow_analysis(*args, **kwargs):
+        await asyncio.sleep(3600)
+
+    before = metrics.counter_value("silk_case_processing_timeouts_total", stage="analysis")
+    with patch("routers.cases.settings.case_processing_timeout_seconds", 0.2), \
+         patch("routers.cases.settings.ner_workers", 0), \
+         patch("services.anonymization.anonymize_paragraphs", new=AsyncMock(side_effect=lambda ps, *args: [(p, True) for p in ps])), \
+         patch("services.claude_service.get_client"), \
+         patch("services.claude_service.analyse_case", new=slow_analysis):
+        asyncio.run(_process_case(case["id"], _run_id(case["id"])))
+
+    db = SessionLocal()
+    assert db.query(Case).filter(Case.id == case["id"]).first().status == "failed"
+    db.close()
+    assert metrics.counter_value("silk_case_processing_timeouts_total", stage="analysis") == before + 1
+
+
+def test_retry_resumes_failed_case_from_last_completed_stage():
+    import asyncio
+    from routers.cases import _process_case
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post("/cases/", json={"title": "Flaky", "brief_raw": "Brief content."}, headers=headers).json()
+
+    anonymize = AsyncMock(side_effect=lambda ps, *args: [(p, True) for p in ps])
+    with patch("services.anonymization.anonymize_paragraphs", new=anonymize), \
+         patch("services.claude_service.get_client"), \
+         patch("services.claude_service.analyse_case", new=AsyncMock(side_effect=RuntimeError("overloaded"))):
+        asyncio.run(_process_case(case["id"], _run_id(case["id"])))
+
+    detail = client.get(f"/cases/{case['id']}", headers=headers).json()
+    assert detail["status"] == "failed"
+    assert [(s["stage"], s["status"]) for s in detail["stages"]] == [("anonymized", "complete"), ("analysed", "failed")]
+    assert detail["stages"][1]["error"] == "overloaded"
+
+    with patch("routers.cases.scheduler.submit") as submit:
+        resp = client.post(f"/cases/{case['id']}/retry", headers=headers)
+    assert resp.status_code == 202
+    submit.assert_called_once()
+
+    result = {
+        "argument_scores": [{"argument": "Delay", "score": 7, "weakness": None, "recommended_pivot": None}],
+        "strategy_report": {"recommended_approach": "Settle"},
+    }
+    with patch("services.anonymization.anonymize_paragraphs", new=anonymize), \
+         patch("services.claude_service.get_client"), \
+         patch("services.claude_service.analyse_case", new=AsyncMock(return_value=result)):
+        asyncio.run(_process_case(case["id"], _run_id(case["id"])))
+
+    assert anonymize.await_count == 1
+    detail = client.get(f"/cases/{case['id']}", headers=headers).json()
+    assert detail["status"] == "complete"
+    assert detail["report"]["recommended_approach"] == "Settle"
+    assert [s["status"] for s in detail["stages"]] == ["complete", "complete", "complete"]
+    assert detail["stages"][1]["attempts"] == 2
+    assert client.post(f"/cases/{case['id']}/retry", headers=headers).status_code == 409
+
+
+def test_retry_recovers_case_stalled_by_a_restart():
+    from datetime import datetime, timedelta
+    from database import SessionLocal
+    from models import Case
+    from services import stages
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases.scheduler.submit"):
+        case = client.post("/cases/", json={"title": "Stuck", "brief_raw": "Brief content."}, headers=headers).json()
+
+    db = SessionLocal()
+    row = db.get(Case, case["id"])
+    row.status = "processing"
+    stages.start(db, case["id"], stages.ANONYMIZED)
+    db.commit()
+    assert client.post(f"/cases/{case['id']}/retry", headers=headers).status_code == 409
+
+    # The worker died mid-run: nothing holds the case and it has outlived the deadline
+    row.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    with patch("routers.cases.scheduler.submit") as submit:
+        resp = client.post(f"/cases/{case['id']}/retry", headers=headers)
+    assert resp.status_code == 202
+    submit.assert_called_once()
+
+    detail = client.get(f"/cases/{case['id']}", headers=headers).json()
+    assert detail["status"] == "pending"
+    assert detail["stages"][0]["status"] == "failed"
+
+    # Likewise a case left pending can be edited again
+    row = db.get(Case, case["id"])
+    db.refresh(row)
+    row.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    db.close()
+    assert client.patch(f"/cases/{case['id']}", json={"title": "Unstuck"}, headers=headers).status_code == 200
+
+
+def test_superseded_or_completed_runs_do_not_reprocess():
+    import asyncio
+    from datetime import datetime, timedelta
+    from database import SessionLocal
+    from models import Case
+    from routers.cases import _process_case
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases.scheduler.submit"):
+        case = client.post("/cases/", json={"title": "Queued", "brief_raw": "Brief content."}, headers=headers).json()
+    original = _run_id(case["id"])
+
+    # Still queued on another worker when the user retries it as stalled
+    db = SessionLocal()
+    db.get(Case, case["id"]).updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    db.close()
+    with patch("routers.cases.scheduler.submit"):
+        assert client.post(f"/cases/{case['id']}/retry", headers=headers).status_code == 202
+    replacement = _run_id(case["id"])
+
+    result = {"argument_scores": [], "strategy_report": {"recommended_approach": "Settle"}}
+    analyse = AsyncMock(return_value=result)
+    with patch("services.anonymization.anonymize_paragraphs",
+               new=AsyncMock(side_effect=lambda ps, *args: [(p, True) for p in ps])), \
+         patch("routers.cases.settings.ner_workers", 0), \
+         patch("services.claude_service.get_client"), \
+         patch("services.claude_service.analyse_case", new=analyse):
+        asyncio.run(_process_case(case["id"], original))
+        assert analyse.await_count == 0
+        assert client.get(f"/cases/{case['id']}", headers=headers).json()["status"] == "pending"
+
+        asyncio.run(_process_case(case["id"], replacement))
+        asyncio.run(_process_case(case["id"], replacement))
+    assert analyse.await_count == 1
+    db = SessionLocal()
+    assert [r.version for r in db.get(Case, case["id"]).reports] == [1]
+    db.close()
+
+
+def test_export_cases_streams_ndjson_with_current_report():
+    import json
+    from database import SessionLocal
+    from models import AnalysisReport, Case
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        first = client.post("/cases/", json={"title": "First", "brief_raw": "One."}, headers=headers).json()
+        client.post("/cases/", json={"title": "Second", "brief_raw": "Two."}, headers=headers)
+
+    db = SessionLocal()
+    case = db.get(Case, first["id"])
+    case.status, case.brief_anonymized = "complete", "[PERSON] argued."
+    db.add(AnalysisReport(case_id=case.id, version=1, is_current=False, recommended_approach="Old"))
+    db.add(AnalysisReport(case_id=case.id, version=2, recommended_approach="Settle", risk_areas=["Delay"]))
+    db.commit()
+    db.close()
+
+    resp = client.get("/cases/export", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["title"] for r in records] == ["First", "Second"]
+    assert records[0]["brief_anonymized"] == "[PERSON] argued."
+    assert records[0]["report"]["version"] == 2
+    assert records[0]["report"]["risk_areas"] == ["Delay"]
+    assert records[1]["report"] is None
+
+
+def test_get_case_returns_304_until_the_case_changes():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post("/cases/", json={"title": "Etag", "brief_raw": "Brief."}, headers=headers).json()
+
+    first = client.get(f"/cases/{case['id']}", headers=headers)
+    etag = first.headers["etag"]
+    assert client.get(f"/cases/{case['id']}", headers={**headers, "If-None-Match": etag}).status_code == 304
+    assert client.get(
+        f"/cases/{case['id']}", headers={**headers, "If-Modified-Since": first.headers["last-modified"]}
+    ).status_code == 304
+
+    from database import SessionLocal
+    from models import Case
+    db = SessionLocal()
+    db.get(Case, case["id"]).status = "failed"
+    db.commit()
+    db.close()
+
+    changed = client.get(f"/cases/{case['id']}", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def _docx_bytes(paragraphs):
+    import io
+    import zipfile
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    xml = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+    return buffer.getvalue()
+
+
+def test_upload_case_extracts_text_from_documents():
+    from database import SessionLocal
+    from models import Case
+
+    token = _get_token()
+    with patch("routers.cases.scheduler.submit") as submit:
+        response = client.post(
+            "/cases/upload",
+            data={"title": "Uploaded Matter", "case_type": "Commercial"},
+            files=[
+                ("files", ("brief.docx", _docx_bytes(["First paragraph.", "Second paragraph."]), "application/octet-stream")),
+                ("files", ("notes.txt", b"Counsel's notes.", "text/plain")),
+            ],
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert response.status_code == 201
+    submit.assert_called_once()
+
+    db = SessionLocal()
+    case = db.query(Case).filter(Case.id == response.json()["id"]).first()
+    assert case.brief_raw == "First paragraph.\n\nSecond paragraph.\n\nCounsel's notes."
+    db.close()
+
+
+def test_upload_case_rejects_unsupported_files():
+    token = _get_token()
+    response = client.post(
+        "/cases/upload",
+        data={"title": "Bad"},
+        files=[("files", ("image.png", b"\x89PNG", "image/png"))],
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 415
+
+
+def test_upload_case_stops_reading_at_the_size_limit():
+    import services.uploads as uploads
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    written = []
+    write = uploads._write
+
+    def body(boundary):
+        yield f'--{boundary}\r\nContent-Disposition: form-data; name="title"\r\n\r\nHuge\r\n'.encode()
+        yield f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="huge.txt"\r\n\r\n'.encode()
+        for _ in range(100):
+            yield b"x" * 64 * 1024
+
+    with patch("routers.cases.settings.max_upload_mb", 1), patch("routers.cases.scheduler.submit") as submit, \
+            patch("services.uploads._write", side_effect=lambda p: (written.extend(c for _, c in p), write(p))):
+        # Declared too large: rejected before the body is read
+        declared = client.post(
+            "/cases/upload",
+            content=b"",
+            headers={**headers, "Content-Type": "multipart/form-data; boundary=b", "Content-Length": str(50 * 1024 * 1024)},
+        )
+        # Undeclared (chunked): rejected once the files pass the limit
+        streamed = client.post(
+            "/cases/upload",
+            content=body("b"),
+            headers={**headers, "Content-Type": "multipart/form-data; boundary=b"},
+        )
+    assert declared.status_code == 413
+    assert streamed.status_code == 413
+    # Nothing past the limit reaches the disk
+    assert sum(len(c) for c in written) <= 1024 * 1024
+    submit.assert_not_called()
+
+
+def test_similar_cases_conflict_until_anonymized():
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post("/cases/", json={"title": "Queued", "brief_raw": "Brief content."}, headers=headers).json()
+
+    resp = client.get(f"/cases/{case['id']}/similar", headers=headers)
+    assert resp.status_code == 409
+
+
+def test_paragraph_cache_is_purged_with_its_case_and_expires():
+    from datetime import datetime, timedelta
+    import cli
+    from database import SessionLocal
+    from models import AnonymizedParagraph, User
+    from routers.cases import _load_paragraph_cache, _store_paragraph_cache
+    from services.anonymization import paragraph_hash
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch("routers.cases._process_case", new_callable=AsyncMock):
+        case = client.post("/cases/", json={"title": "A", "brief_raw": "Alpha.\n\nBeta."}, headers=headers).json()
+
+    db = SessionLocal()
+    owner_id = db.query(User.id).scalar()
+    _store_paragraph_cache(db, owner_id, {paragraph_hash("Alpha."): "[PERSON].", paragraph_hash("Gamma."): "G."})
+    db.commit()
+    assert _load_paragraph_cache(db, owner_id, "Alpha.\n\nGamma.") == {
+        paragraph_hash("Alpha."): "[PERSON].", paragraph_hash("Gamma."): "G."
+    }
+
+    assert client.delete(f"/cases/{case['id']}", headers=headers).status_code == 204
+    db.expire_all()
+    assert [h for (h,) in db.query(AnonymizedParagraph.content_hash)] == [paragraph_hash("Gamma.")]
+
+    db.query(AnonymizedParagraph).update({"created_at": datetime.utcnow() - timedelta(days=365)})
+    db.commit()
+    assert _load_paragraph_cache(db, owner_id, "Gamma.") == {}
+    assert cli.main(["purge-paragraph-cache"]) == 0
+    assert db.query(AnonymizedParagraph).count() == 0
+    db.close()
@@ -0,0 +1,122 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import cli
+from database import Base, engine, init_db, SessionLocal
+from models import AnalysisReport, AnonymizedParagraph, Case, User
+
+RESULT = {"argument_scores": [{"score": 6}], "strategy_report": {"recommended_approach": "Re-run"}}
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _seed(count):
+    db = SessionLocal()
+    user = User(email="admin@test.com", hashed_password="x", full_name="Admin")
+    db.add(user)
+    db.flush()
+    ids = []
+    for i in range(count):
+        case = Case(owner_id=user.id, title=f"Case {i}", brief_raw="x", brief_anonymized="[PERSON] sued.", status="complete")
+        db.add(case)
+        db.flush()
+        db.add(AnalysisReport(case_id=case.id, model="claude-old", prompt_version="0"))
+        ids.append(case.id)
+    db.commit()
+    db.close()
+    return ids
+
+
+def test_backfill_writes_new_report_versions_and_resumes(tmp_path):
+    ids = _seed(3)
+    checkpoint = str(tmp_path / "run.ckpt")
+
+    with patch("services.claude_service.analyse_case", new=AsyncMock(return_value=RESULT)) as analyse:
+        assert cli.main(["backfill", "--checkpoint", checkpoint, "--limit", "2", "--rpm", "0"]) == 0
+        assert analyse.await_count == 2
+        assert cli.main(["backfill", "--checkpoint", checkpoint, "--rpm", "0"]) == 0
+        assert analyse.await_count == 3
+
+    db = SessionLocal()
+    for case_id in ids:
+        case = db.get(Case, case_id)
+        assert [r.version for r in case.reports] == [1, 2]
+        assert case.report.version == 2
+        assert case.report.recommended_approach == "Re-run"
+    db.close()
+
+    # Every report is now current-model, so a fresh run has nothing to do
+    with patch("services.claude_service.analyse_case", new=AsyncMock(return_value=RESULT)) as analyse:
+        assert cli.main(["backfill", "--checkpoint", str(tmp_path / "fresh.ckpt"), "--rpm", "0"]) == 0
+        analyse.assert_not_awaited()
+
+
+def test_compress_columns_rewrites_legacy_rows():
+    from sqlalchemy import text
+    from database import IS_SQLITE
+
+    if not IS_SQLITE:
+        pytest.skip("writes legacy values with SQLite typing")
+    ids = _seed(1)
+    legacy_brief = "The claimant alleges breach of contract. " * 20
+    db = SessionLocal()
+    db.execute(text("UPDATE cases SET brief_raw = :b"), {"b": legacy_brief})
+    db.execute(text("UPDATE analysis_reports SET argument_scores = :j"), {"j": '[{"argument": "Delay", "score": 4}]'})
+    owner_id = db.get(Case, ids[0]).owner_id
+    for content_hash in ("a" * 64, "b" * 64):
+        db.execute(
+            text("INSERT INTO anonymized_paragraphs (owner_id, content_hash, anonymized) VALUES (:o, :h, :a)"),
+            {"o": owner_id, "h": content_hash, "a": f"{content_hash[0]}: [PERSON] gave evidence. " * 10},
+        )
+    db.commit()
+    db.close()
+
+    assert cli.main(["compress-columns"]) == 0
+
+    db = SessionLocal()
+    stored_type, stored_len = db.execute(text("SELECT typeof(brief_raw), length(brief_raw) FROM cases")).one()
+    assert stored_type == "blob" and stored_len < len(legacy_brief) / 3
+    case = db.get(Case, ids[0])
+    assert case.brief_raw == legacy_brief
+    assert case.report.argument_scores == [{"argument": "Delay", "score": 4}]
+    # Composite primary key: each paragraph row is rewritten on its own
+    cached = dict(db.query(AnonymizedParagraph.content_hash, AnonymizedParagraph.anonymized))
+    assert cached == {h: f"{h[0]}: [PERSON] gave evidence. " * 10 for h in ("a" * 64, "b" * 64)}
+    assert db.execute(text("SELECT count(*) FROM anonymized_paragraphs WHERE typeof(anonymized) = 'blob'")).scalar() == 2
+    db.close()
+
+
+def test_reindex_similar_indexes_existing_cases():
+    from models import CaseSignature
+
+    ids = _seed(3)
+    assert cli.main(["reindex-similar", "--batch-size", "2"]) == 0
+
+    db = SessionLocal()
+    assert {s.case_id for s in db.query(CaseSignature)} == set(ids)
+    db.close()
+
+
+def test_reindex_search_indexes_existing_cases():
+    from services.search import search_cases
+
+    ids = _seed(3)
+    db = SessionLocal()
+    owner_id = db.get(Case, ids[0]).owner_id
+    assert search_cases(db, owner_id, "sued", limit=10, offset=0)[0] == 0
+    db.close()
+
+    assert cli.main(["reindex-search", "--batch-size", "2"]) == 0
+    assert cli.main(["reindex-search"]) == 0  # refreshes rather than duplicates
+
+    db = SessionLocal()
+    total, hits = search_cases(db, owner_id, "sued", limit=10, offset=0)
+    assert total == 3 and {case_id for case_id, _, _ in hits} == set(ids)
+    db.close()
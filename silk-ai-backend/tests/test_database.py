@@ -0,0 +1,165 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+
+from database import IS_SQLITE, engine, write_session
+from config import settings
+
+
+@pytest.mark.skipif(not IS_SQLITE, reason="SQLite-specific pragmas")
+def test_sqlite_connections_use_wal_and_busy_timeout():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout_ms
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_write_session_rolls_back_on_error():
+    from database import init_db
+    from models import User
+
+    init_db()
+    with pytest.raises(RuntimeError):
+        with write_session() as db:
+            db.add(User(email="rollback@test.com", hashed_password="x", full_name="R"))
+            db.flush()
+            raise RuntimeError("boom")
+
+    with write_session() as db:
+        assert db.query(User).filter(User.email == "rollback@test.com").first() is None
+
+
+@pytest.mark.skipif(not IS_SQLITE, reason="SQLite single-writer behaviour")
+def test_concurrent_background_writers_are_serialised():
+    from concurrent.futures import ThreadPoolExecutor
+    from database import init_db
+    from models import UsageLedgerEntry
+
+    init_db()
+    with write_session() as db:
+        db.query(UsageLedgerEntry).delete()
+        db.add(UsageLedgerEntry(purpose="counter", model="m", input_tokens=0))
+
+    def increment(_):
+        # Read-then-write: without serialisation these race, lose updates or fail with "database is locked"
+        with write_session() as db:
+            entry = db.query(UsageLedgerEntry).filter(UsageLedgerEntry.purpose == "counter").one()
+            entry.input_tokens += 1
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(increment, range(40)))
+
+    with write_session() as db:
+        entry = db.query(UsageLedgerEntry).filter(UsageLedgerEntry.purpose == "counter").one()
+        assert entry.input_tokens == 40
+        db.delete(entry)
+
+
+def test_compressed_columns_round_trip_and_read_legacy_text():
+    from column_types import CompressedJSON, CompressedText, compress
+
+    text_type, json_type = CompressedText(), CompressedJSON()
+    brief = "[PERSON] instructed counsel on the balance of probabilities. " * 50
+    stored = text_type.process_bind_param(brief, engine.dialect)
+    assert len(stored) < len(brief) / 5
+    assert text_type.process_result_value(stored, engine.dialect) == brief
+    assert text_type.process_result_value("short legacy value", engine.dialect) == "short legacy value"
+    assert compress(b"tiny")[:1] == b"\x00"
+
+    scores = [{"argument": "Limitation", "score": 7.5}]
+    assert json_type.process_result_value(json_type.process_bind_param(scores, engine.dialect), engine.dialect) == scores
+    assert json_type.process_result_value(b'[{"a": 1}]', engine.dialect) == [{"a": 1}]
+
+
+# Tables as created by the baseline release, before Alembic was adopted
+BASELINE_DDL = [
+    """CREATE TABLE users (
+        id VARCHAR NOT NULL, email VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL,
+        full_name VARCHAR NOT NULL, firm VARCHAR, is_active BOOLEAN, created_at DATETIME, PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE cases (
+        id VARCHAR NOT NULL, owner_id VARCHAR NOT NULL, title VARCHAR NOT NULL, brief_raw TEXT NOT NULL,
+        brief_anonymized TEXT, case_type VARCHAR, jurisdiction VARCHAR, status VARCHAR,
+        created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES users (id)
+    )""",
+    """CREATE TABLE analysis_reports (
+        id VARCHAR NOT NULL, case_id VARCHAR NOT NULL, recommended_argument_style TEXT,
+        argument_style_rationale TEXT, barrister_profiles JSON, ruling_prediction TEXT, ruling_confidence FLOAT,
+        precedent_cases JSON, argument_scores JSON, overall_strength FLOAT, recommended_approach TEXT,
+        opposition_arguments JSON, risk_areas JSON, preparation_steps JSON, created_at DATETIME,
+        PRIMARY KEY (id), UNIQUE (case_id), FOREIGN KEY(case_id) REFERENCES cases (id)
+    )""",
+]
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    from sqlalchemy import create_engine
+
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as conn:
+        for ddl in BASELINE_DDL:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO users (id, email, hashed_password, full_name) VALUES ('u1', 'a@b.c', 'x', 'A')"))
+        conn.execute(text(
+            "INSERT INTO cases (id, owner_id, title, brief_raw, status) VALUES ('c1', 'u1', 'Old', 'Brief', 'complete')"
+        ))
+        conn.execute(text(
+            "INSERT INTO analysis_reports (id, case_id, recommended_approach, risk_areas) "
+            "VALUES ('r1', 'c1', 'Settle early', '[\"Limitation\"]')"
+        ))
+    yield legacy
+    legacy.dispose()
+
+
+def test_upgrade_migrates_a_baseline_database(baseline_engine):
+    from sqlalchemy.orm import Session
+
+    import migrations
+    from database import Base
+    from models import Case
+    from services.reports import save_report
+
+    Base.metadata.create_all(bind=baseline_engine)
+    migrations.upgrade(baseline_engine)
+    migrations.upgrade(baseline_engine)  # already at head: nothing to run
+    with baseline_engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == "0005"
+
+    with Session(baseline_engine) as db:
+        case = db.get(Case, "c1")
+        assert case.title == "Old" and case.use_prior_analyses is False
+        assert case.owner.firm_verified is False
+        assert (case.report.id, case.report.version) == ("r1", 1)
+        assert case.report.risk_areas == ["Limitation"]
+
+        # The old UNIQUE (case_id) no longer blocks a second version
+        with patch("services.reports.search.index_case"):
+            save_report(db, case, {"strategy_report": {"recommended_approach": "Go to trial"}})
+        db.commit()
+        db.expire_all()
+        assert [r.version for r in case.reports] == [1, 2]
+        assert case.report.recommended_approach == "Go to trial"
+
+
+def test_revisions_build_the_model_schema(tmp_path):
+    from sqlalchemy import create_engine, inspect
+
+    from alembic import command
+    from database import Base
+    import migrations
+
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    with migrated.begin() as conn:
+        command.upgrade(migrations._config(conn), "head")
+    with migrated.connect() as conn:
+        inspector = inspect(conn)
+        for name in ("users", "cases", "analysis_reports"):
+            assert {c["name"] for c in inspector.get_columns(name)} == set(Base.metadata.tables[name].columns.keys())
+        assert not inspector.get_unique_constraints("analysis_reports")
+        indexes = {i["name"]: i["unique"] for i in inspector.get_indexes("analysis_reports")}
+        assert indexes["uq_analysis_reports_current_case"]
+    with migrated.begin() as conn:
+        command.downgrade(migrations._config(conn), "base")
+    migrated.dispose()
@@ -0,0 +1,33 @@
+import os
+
+from services import ner
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "ner_legal_briefs.jsonl")
+
+
+def test_regex_backend_finds_people_organisations_and_dates():
+    text = "Mr Okafor sued Harwood Logistics Ltd on 14 March 2019; Margaret Ellison gave evidence in the High Court."
+    found = {text[start:end]: label for start, end, label in ner.load_backend("regex").entities(text)}
+    assert found == {
+        "Mr Okafor": "PERSON",
+        "Harwood Logistics Ltd": "ORG",
+        "14 March 2019": "DATE",
+        "Margaret Ellison": "PERSON",
+    }
+
+
+def test_unavailable_backend_falls_back_to_regex(monkeypatch):
+    def missing():
+        raise ner.BackendUnavailable("model not installed")
+
+    monkeypatch.setitem(ner.BACKENDS, "missing", missing)
+    assert ner.get_backend("missing").name == "regex"
+
+
+def test_benchmark_reports_throughput_and_recall_on_fixtures():
+    samples = ner.load_fixtures(FIXTURES)
+    result = ner.benchmark(ner.load_backend("regex"), samples, repeat=1)
+    assert result.chars == sum(len(text) for text, _ in samples)
+    assert result.chars_per_second > 0
+    assert 0.5 < result.recall <= 1.0
+    assert set(result.recall_by_label) >= {"PERSON", "ORG", "DATE"}
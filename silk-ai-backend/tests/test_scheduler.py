@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from services.scheduler import FairScheduler
+
+
+async def _drain(scheduler, jobs):
+    order = []
+    release = asyncio.Event()
+
+    def make(label):
+        async def run():
+            order.append(label)
+            await release.wait()
+        return run
+
+    tasks = [scheduler.submit(f"{label}", user, firm, make(label)) for label, user, firm in jobs]
+    for _ in range(len(jobs)):
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0)
+        release.clear()
+    release.set()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_bulk_tenant_does_not_starve_others():
+    scheduler = FairScheduler(max_concurrency=1, max_per_tenant=1, max_per_user=1)
+    jobs = [(f"bulk-{i}", "u1", "Big Firm") for i in range(5)] + [("small-0", "u2", None), ("small-1", "u2", None)]
+    order = await _drain(scheduler, jobs)
+    assert order.index("small-0") <= 2
+    assert order.index("small-1") <= 4
+
+
+@pytest.mark.asyncio
+async def test_per_user_and_tenant_caps_are_enforced():
+    scheduler = FairScheduler(max_concurrency=10, max_per_tenant=3, max_per_user=2)
+    release = asyncio.Event()
+
+    async def run():
+        await release.wait()
+
+    tasks = [scheduler.submit(f"a-{i}", "alice", "Firm", run) for i in range(4)]
+    tasks += [scheduler.submit(f"b-{i}", "bob", "Firm", run) for i in range(4)]
+    await asyncio.sleep(0)
+
+    assert scheduler.depth("alice", "Firm") == {
+        "tenant_queued": 5, "tenant_running": 3, "user_queued": 2, "user_running": 2,
+    }
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.snapshot() == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_job_leaves_queue():
+    scheduler = FairScheduler(max_concurrency=1, max_per_tenant=1, max_per_user=1)
+    release = asyncio.Event()
+
+    async def run():
+        await release.wait()
+
+    running = scheduler.submit("first", "u1", None, run)
+    queued = scheduler.submit("second", "u1", None, run)
+    await asyncio.sleep(0)
+    queued.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.depth("u1", None)["user_queued"] == 0
+    release.set()
+    await running
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_job_frees_its_slot():
+    scheduler = FairScheduler(max_concurrency=1, max_per_tenant=1, max_per_user=1)
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(3600)
+
+    task = scheduler.submit("case-1", "u1", None, hang)
+    await started.wait()
+    assert scheduler.cancel("case-1")
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scheduler.snapshot() == {}
+    assert not scheduler.cancel("case-1")
@@ -0,0 +1,53 @@
+import numpy as np
+
+from services.similarity import minhash_signature, find_similar, index_case
+
+TEMPLATE = (
+    "The claimant [ORGANISATION] entered into a supply agreement with the defendant [ORGANISATION] "
+    "for the delivery of industrial components. The defendant failed to deliver within the agreed "
+    "period and the claimant seeks damages for breach of contract and loss of profit. "
+)
+
+
+def test_minhash_estimates_near_duplicates_as_similar():
+    a = minhash_signature(TEMPLATE * 3)
+    b = minhash_signature(TEMPLATE * 3 + "The claimant also seeks interest on [AMOUNT].")
+    c = minhash_signature("An appeal against sentence on the ground that the trial judge misdirected the jury.")
+    assert np.mean(a == b) > 0.7
+    assert np.mean(a == c) < 0.2
+
+
+def test_minhash_empty_text_has_no_signature():
+    assert minhash_signature("   ") is None
+
+
+def test_find_similar_returns_nearest_owned_cases():
+    from database import Base, engine, init_db, SessionLocal
+    from models import User, Case
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(email="sim@test.com", hashed_password="x", full_name="Sim")
+        db.add(user)
+        db.flush()
+        target, twin, unrelated = (
+            Case(owner_id=user.id, title=t, brief_raw="x", brief_anonymized=b)
+            for t, b in [
+                ("Target", TEMPLATE * 2),
+                ("Twin", TEMPLATE * 2 + "Costs are sought."),
+                ("Unrelated", "A judicial review of a planning decision by [ORGANISATION]."),
+            ]
+        )
+        db.add_all([target, twin, unrelated])
+        db.flush()
+        for case in (target, twin, unrelated):
+            index_case(db, case)
+        db.commit()
+
+        matches = find_similar(db, target)
+        assert [case_id for case_id, _ in matches] == [twin.id]
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
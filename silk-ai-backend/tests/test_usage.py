@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from database import Base, engine, init_db, SessionLocal
+from models import UsageLedgerEntry
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _register(firm=None, email="billing@test.com"):
+    return client.post("/auth/register", json={
+        "email": email, "password": "pass123", "full_name": "Billing", "firm": firm,
+    }).json()
+
+
+def _message(text, **usage):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=SimpleNamespace(**usage))
+
+
+def test_analyse_case_records_tokens_and_cost_against_attributed_case():
+    from services import usage
+    from services.claude_service import analyse_case
+
+    import cli
+
+    reg = _register(firm="Denning Chambers")
+    assert cli.main(["verify-firm-member", "billing@test.com", "--firm", "Denning Chambers"]) == 0
+    message = _message(
+        '{"argument_scores": []}',
+        input_tokens=1000, output_tokens=2000, cache_creation_input_tokens=100, cache_read_input_tokens=1000,
+    )
+    fake_client = SimpleNamespace(messages=SimpleNamespace(create=AsyncMock(return_value=message)))
+
+    async def run():
+        usage.attribute_to(reg["user"]["id"], "Denning Chambers", "case-1")
+        return await analyse_case("[PERSON] sued.", None, None)
+
+    with patch("services.claude_service.get_client", return_value=fake_client), \
+            patch("services.claude_service.rate_limiter.rate", 0):
+        assert asyncio.run(run()) == {"argument_scores": []}
+
+    db = SessionLocal()
+    entry = db.query(UsageLedgerEntry).one()
+    db.close()
+    assert (entry.owner_id, entry.firm, entry.case_id, entry.purpose) == (
+        reg["user"]["id"], "Denning Chambers", "case-1", "analysis"
+    )
+    assert entry.input_tokens == 1000 and entry.cache_read_input_tokens == 1000
+    # 1000 x $5 + 100 x $6.25 + 1000 x $0.50 + 2000 x $25, per million tokens
+    assert entry.cost_usd == pytest.approx(0.056125)
+
+    headers = {"Authorization": f"Bearer {reg['access_token']}"}
+    report = client.get("/usage/?group_by=case", headers=headers).json()
+    assert report["total"]["calls"] == 1
+    assert report["groups"] == [{**report["total"], "key": "case-1"}]
+    assert client.get("/usage/firm?group_by=model", headers=headers).json()["groups"][0]["key"] == "claude-opus-4-5"
+
+
+def test_cases_are_rejected_once_the_budget_is_spent():
+    reg = _register()
+    headers = {"Authorization": f"Bearer {reg['access_token']}"}
+    db = SessionLocal()
+    db.add(UsageLedgerEntry(owner_id=reg["user"]["id"], purpose="analysis", model="claude-opus-4-5", cost_usd=12.5))
+    db.commit()
+    db.close()
+
+    with patch("services.usage.settings.usage_budget_user_usd", 10.0), \
+            patch("routers.cases._process_case", new_callable=AsyncMock) as process:
+        resp = client.post("/cases/", json={"title": "Over", "brief_raw": "Brief."}, headers=headers)
+        budget = client.get("/usage/budget", headers=headers).json()
+
+    assert resp.status_code == 402
+    process.assert_not_called()
+    assert budget["user_spent_usd"] == 12.5 and budget["user_budget_usd"] == 10.0
+
+
+def test_firm_usage_and_budget_need_verified_membership():
+    from routers.cases import _ensure_budget
+    from models import User
+
+    impostor = _register(firm="Denning Chambers", email="impostor@test.com")
+    headers = {"Authorization": f"Bearer {impostor['access_token']}"}
+    db = SessionLocal()
+    db.add(UsageLedgerEntry(firm="Denning Chambers", purpose="analysis", model="claude-opus-4-5", cost_usd=50.0))
+    db.commit()
+
+    assert client.get("/usage/firm?group_by=user", headers=headers).status_code == 403
+    budget = client.get("/usage/budget", headers=headers).json()
+    assert budget["firm_spent_usd"] is None
+
+    # The firm's spent budget is neither visible to nor enforced against an unverified claimant
+    with patch("services.usage.settings.usage_budget_firm_usd", 10.0):
+        _ensure_budget(db, db.get(User, impostor["user"]["id"]))
+    db.close()